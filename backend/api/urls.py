@@ -1,8 +1,16 @@
 from django.urls import path, include
 
+from cells.base.jobs import JobStatusView
+from cells.base.results import ResultPageView
+from cells.base.metrics import metrics_view
+
 urlpatterns = [
+    path('metrics/', metrics_view, name='metrics'),
     path('cells/', include([
         path('wikipedia/', include('cells.wikipedia.urls')),
+        path('jobs/', JobStatusView.as_view(), name='cell_job_queue'),
+        path('jobs/<str:job_id>/', JobStatusView.as_view(), name='cell_job_status'),
+        path('results/<str:result_id>/', ResultPageView.as_view(), name='cell_result_page'),
         path('', include('cells.sustainability.urls')),
     ])),
 ]
@@ -0,0 +1,289 @@
+"""Offline benchmarks for the extraction and estimation pipeline.
+
+Run from the backend folder, with the same .env the server uses:
+
+    python -m benchmarks --sizes small,medium --save benchmarks/baseline.json
+    python -m benchmarks --sizes small,medium --compare benchmarks/baseline.json
+
+Inputs are generated synthetically and extract_values is replaced by a deterministic fake with
+--llm-latency seconds per call, so no documents or LLM endpoint are needed. Every case reports wall
+time percentiles, throughput, and the time and peak Python memory of each pipeline stage.
+
+Memory is traced with tracemalloc in one extra run with PDF text extraction kept in this process, as
+allocations in pool workers are not visible to it. Stages run concurrently on worker threads, so a
+stage's peak is the high-water mark of the whole Python heap while that stage was running.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from unittest import mock
+
+import numpy as np
+
+SIZES = {
+    'small': {'cdp_sections': 50, 'pdf_pages': 30, 'report_years': 2, 'years': 5, 'activities': 0},
+    'medium': {'cdp_sections': 400, 'pdf_pages': 150, 'report_years': 3, 'years': 10, 'activities': 2},
+    'large': {'cdp_sections': 1500, 'pdf_pages': 500, 'report_years': 4, 'years': 20, 'activities': 6},
+}
+
+
+def setup_django(workdir):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    # Keep the benchmark's extractions out of the server's caches
+    os.environ['LLM_CACHE_DIR'] = os.path.join(workdir, 'llm_cache')
+    os.environ['DOCUMENT_CACHE_DIR'] = os.path.join(workdir, 'document_cache')
+    import django
+    django.setup()
+
+
+def cdp_tables_case(size, config_dict, config_file, workdir):
+    from cells.sustainability.cdp_html import CDPHtmlIndex
+    from cells.sustainability.data_extraction import get_cdp_table_data
+    from .synthetic import cdp_html
+
+    text = cdp_html(2021, size['cdp_sections'])
+
+    def run():
+        get_cdp_table_data(CDPHtmlIndex(text), 2021)
+    return run, len(text) / 1e6, 'MB'
+
+
+def cdp_report_case(size, config_dict, config_file, workdir):
+    from cells.sustainability.data_extraction import process_cdp_report
+    from .synthetic import write_reports
+
+    cdp_folder, _, output_folder = write_reports(workdir, size, config_dict)
+
+    def run():
+        process_cdp_report(cdp_folder, output_folder, config_file, use_cache=False)
+    return run, len(os.listdir(cdp_folder)), 'files'
+
+
+def annual_report_case(size, config_dict, config_file, workdir):
+    from cells.sustainability.data_extraction import process_annual_report
+    from .synthetic import write_reports
+
+    _, annual_folder, _ = write_reports(workdir, size, config_dict)
+
+    def run():
+        process_annual_report(annual_folder, config_file, use_cache=False)
+    return run, size['pdf_pages'] * size['report_years'], 'pages'
+
+
+def ccf_estimates_case(size, config_dict, config_file, workdir):
+    from cells.sustainability.get_ccf_data import get_ongil_ccf_estimates
+    from .synthetic import emissions_frames
+
+    df, predictors, pred_mat = emissions_frames(config_dict, size['years'], size['activities'])
+
+    def run():
+        get_ongil_ccf_estimates(df, predictors, pred_mat)
+    return run, len(pred_mat), 'series'
+
+
+CASES = {
+    'cdp_tables': cdp_tables_case,
+    'process_cdp_report': cdp_report_case,
+    'process_annual_report': annual_report_case,
+    'ccf_estimates': ccf_estimates_case,
+}
+
+
+def percentiles(values):
+    return {
+        'p50': round(float(np.percentile(values, 50)), 4),
+        'p95': round(float(np.percentile(values, 95)), 4),
+        'max': round(float(np.max(values)), 4),
+    }
+
+
+def traced_peaks(run, interval=0.005):
+    """Run once under tracemalloc, returning the overall peak and the peak seen while each stage ran"""
+    from cells.base.metrics import request_breakdown
+    from cells.sustainability import pdf_text
+
+    peaks = {}
+    overall = 0
+
+    def sample(breakdown):
+        nonlocal overall
+        # The peak since the previous sample is charged to every stage running in that window
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        overall = max(overall, peak)
+        for stage in breakdown.drain_active():
+            peaks[stage] = max(peaks.get(stage, 0), peak)
+
+    stop = threading.Event()
+
+    def sample_until_stopped(breakdown):
+        while not stop.wait(interval):
+            sample(breakdown)
+
+    with request_breakdown() as breakdown, mock.patch.object(pdf_text, 'PDF_TEXT_PROCESSES', 1):
+        sampler = threading.Thread(target=sample_until_stopped, args=(breakdown,))
+        tracemalloc.start()
+        try:
+            sampler.start()
+            try:
+                run()
+            finally:
+                stop.set()
+                sampler.join()
+            sample(breakdown)
+        finally:
+            tracemalloc.stop()
+    return overall, peaks
+
+
+def measure(run, units, unit, repeats, warmup):
+    """Time `repeats` runs after `warmup` untimed ones, then one more under tracemalloc for peak memory"""
+    from cells.base.metrics import request_breakdown
+
+    for _ in range(warmup):
+        run()
+    walls = []
+    stages = {}
+    for _ in range(repeats):
+        with request_breakdown() as breakdown:
+            start = time.perf_counter()
+            run()
+            walls.append(time.perf_counter() - start)
+        for stage, entry in breakdown.summary().items():
+            stages.setdefault(stage, []).append(entry['seconds'])
+
+    peak, stage_peaks = traced_peaks(run)
+
+    wall = percentiles(walls)
+    return {
+        'runs': repeats,
+        'wall_seconds': wall,
+        'throughput': {'value': round(units / wall['p50'], 3) if wall['p50'] > 0 else None, 'unit': f"{unit}/s"},
+        'stages': {
+            stage: dict(percentiles(values), peak_memory_mb=round(stage_peaks.get(stage, 0) / 1e6, 2))
+            for stage, values in sorted(stages.items())
+        },
+        'peak_memory_mb': round(peak / 1e6, 2),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    """Print the change against a saved baseline; returns the keys that regressed by more than threshold"""
+    regressions = []
+    print(f"\n{'case':<40} {'p50 s':>10} {'base':>10} {'change':>8} {'peak MB':>9} {'base':>9}")
+    for key, result in results.items():
+        base = baseline['results'].get(key)
+        if base is None:
+            print(f"{key:<40} {result['wall_seconds']['p50']:>10} {'-':>10}")
+            continue
+        now, before = result['wall_seconds']['p50'], base['wall_seconds']['p50']
+        change = (now - before) / before if before > 0 else 0.0
+        mem_change = (result['peak_memory_mb'] - base['peak_memory_mb']) / base['peak_memory_mb'] if base['peak_memory_mb'] > 0 else 0.0
+        flag = ''
+        if change > threshold or mem_change > threshold:
+            regressions.append(key)
+            flag = '  REGRESSION'
+        print(
+            f"{key:<40} {now:>10} {before:>10} {change:>+8.1%} "
+            f"{result['peak_memory_mb']:>9} {base['peak_memory_mb']:>9}{flag}"
+        )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the extraction and estimation pipeline on synthetic inputs")
+    parser.add_argument('--cases', default=','.join(CASES), help="comma separated, from: " + ', '.join(CASES))
+    parser.add_argument('--sizes', default='small', help="comma separated, from: " + ', '.join(SIZES))
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--llm-latency', type=float, default=0.2, help="seconds the fake extract_values takes per call")
+    parser.add_argument('--config', default=None, help="config workbook, defaults to media/required/beverage_config.xlsx")
+    parser.add_argument('--save', help="write the results to this JSON file as a baseline")
+    parser.add_argument('--compare', help="baseline JSON file to compare against")
+    parser.add_argument('--threshold', type=float, default=0.2, help="relative slowdown or memory growth counted as a regression")
+    args = parser.parse_args()
+
+    cases = [c for c in args.cases.split(',') if c]
+    sizes = [s for s in args.sizes.split(',') if s]
+    unknown = [c for c in cases if c not in CASES] + [s for s in sizes if s not in SIZES]
+    if unknown:
+        parser.error(f"unknown cases or sizes: {', '.join(unknown)}")
+
+    with tempfile.TemporaryDirectory(prefix='benchmarks-') as workdir:
+        setup_django(workdir)
+        from config.settings import MEDIA_ROOT
+        from cells.sustainability.config_workbook import load_config
+        from .fake_llm import FakeExtractor, fake_extract_values
+
+        config_file = args.config or os.path.join(MEDIA_ROOT, 'required', 'beverage_config.xlsx')
+        # Parsed once up front, so no case pays for reading the workbook
+        config_dict = load_config(config_file).sheets
+        extractor = FakeExtractor(config_dict['annual_reports']['Parameter'].tolist(), args.llm_latency)
+
+        results = {}
+        with fake_extract_values(extractor):
+            for size_name in sizes:
+                for case in cases:
+                    key = f"{case}/{size_name}"
+                    case_dir = os.path.join(workdir, key.replace('/', '_'))
+                    os.makedirs(case_dir)
+                    run, units, unit = CASES[case](SIZES[size_name], config_dict, config_file, case_dir)
+                    calls = extractor.calls
+                    result = measure(run, units, unit, args.repeats, args.warmup)
+                    result['llm_calls_per_run'] = (extractor.calls - calls) // (args.repeats + args.warmup + 1)
+                    results[key] = result
+                    print(
+                        f"{key:<40} p50 {result['wall_seconds']['p50']:.3f}s p95 {result['wall_seconds']['p95']:.3f}s "
+                        f"{result['throughput']['value']} {result['throughput']['unit']} peak {result['peak_memory_mb']} MB "
+                        f"llm calls {result['llm_calls_per_run']}"
+                    )
+                    for stage, timing in result['stages'].items():
+                        print(f"    {stage:<36} p50 {timing['p50']:.3f}s p95 {timing['p95']:.3f}s peak {timing['peak_memory_mb']} MB")
+        print("\nPeak memory is the Python heap traced in one run with PDF text extraction in-process; "
+              "a stage's peak covers everything running alongside it.")
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'created': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'llm_latency': args.llm_latency,
+            'repeats': args.repeats,
+        },
+        'sizes': {size: SIZES[size] for size in sizes},
+        'results': results,
+    }
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved results to {args.save}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+import copy
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from cells.base.metrics import span
+from .synthetic import stable_number
+
+YEAR_RE = re.compile(r"\b(20\d\d)\b")
+
+
+class FakeExtractor:
+    """Deterministic stand-in for extract_values: fills every parameter with a value derived from its name.
+
+    Each call sleeps for `latency` seconds, so the pipeline's overlap of LLM calls is measured as it would be
+    against the real endpoint, without any network access.
+    """
+
+    def __init__(self, parameters, latency=0.0):
+        self.parameters = parameters
+        self.latency = latency
+        self.calls = 0
+        self.prompt_chars = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, context, relevant, previous=None, use_cache=True):
+        with self._lock:
+            self.calls += 1
+            self.prompt_chars += len(context) + len(relevant)
+        if self.latency > 0:
+            # Recorded under the same stage as the real extract_values
+            with span('llm_extract'):
+                time.sleep(self.latency)
+        years = YEAR_RE.findall(relevant[:5000])
+        reporting_year = int(years[0]) if years else 2022
+        if isinstance(previous, dict) and previous.get('parameter_list'):
+            output = copy.deepcopy(previous)
+            output.setdefault('reporting_year', reporting_year)
+        else:
+            output = {
+                'reporting_year': reporting_year,
+                'parameter_list': [{'Parameter': p, 'Value': None, 'Units': 'USD'} for p in self.parameters]
+            }
+        for row in output['parameter_list']:
+            if row.get('Value') is None:
+                row['Value'] = float(stable_number(row['Parameter'], reporting_year) % 100_000)
+        return output
+
+
+@contextmanager
+def fake_extract_values(extractor):
+    """Swap the pipeline's extract_values for the fake for the duration of the block"""
+    from cells.sustainability import data_extraction
+    original = data_extraction.extract_values
+    data_extraction.extract_values = extractor
+    try:
+        yield extractor
+    finally:
+        data_extraction.extract_values = original
@@ -0,0 +1,162 @@
+import os
+import zlib
+
+import numpy as np
+import pandas as pd
+
+ENERGY_TABLE = """<table><tr><th>Activity</th><th>Heating value</th><th>MWh from renewable sources</th><th>MWh from non-renewable sources</th><th>Total (renewable and non-renewable) MWh</th></tr>
+<tr><td>Consumption of fuel (excluding feedstock)</td><td>HHV</td><td>{fuel_r}</td><td>{fuel_n}</td><td>{fuel_t}</td></tr>
+<tr><td>Consumption of purchased or acquired electricity</td><td>n/a</td><td>{elec_r}</td><td>{elec_n}</td><td>{elec_t}</td></tr>
+<tr><td>Consumption of self-generated non-fuel renewable energy</td><td>n/a</td><td>{self_r}</td><td>n/a</td><td>{self_r}</td></tr>
+<tr><td>Total energy consumption</td><td>n/a</td><td>{tot_r}</td><td>{tot_n}</td><td>{tot_t}</td></tr></table>"""
+
+FILLER = "Describe the processes and governance in place for the organisation's climate related activities. "
+
+
+def stable_number(*parts):
+    """Deterministic pseudo-random number for a set of labels, the same on every run and platform"""
+    return zlib.crc32('|'.join(str(p) for p in parts).encode())
+
+
+def cdp_html(year, sections=50, rows_per_table=20):
+    """A CDP HTML export with the emissions questions, the C8 energy table and `sections` filler questions"""
+    rng = np.random.default_rng(year)
+    fuel_r, fuel_n, elec_r, elec_n, self_r = rng.integers(1_000, 100_000, 5)
+    energy = ENERGY_TABLE.format(
+        fuel_r=fuel_r, fuel_n=fuel_n, fuel_t=fuel_r + fuel_n, elec_r=elec_r, elec_n=elec_n, elec_t=elec_r + elec_n,
+        self_r=self_r, tot_r=fuel_r + elec_r + self_r, tot_n=fuel_n + elec_n, tot_t=fuel_r + fuel_n + elec_r + elec_n + self_r
+    )
+    filler = []
+    for i in range(sections):
+        code = f"C{i % 5 + 1}.{i % 9 + 1}"
+        rows = ''.join(
+            f"<tr><td>Item {j}</td><td>{rng.integers(1, 10_000):,}</td><td>{FILLER[:40]}</td></tr>" for j in range(rows_per_table)
+        )
+        filler.append(
+            f"<h2>{code}</h2><p>({code}) {FILLER * 4}</p>"
+            f"<table><tr><th>Item</th><th>Value</th><th>Comment</th></tr>{rows}</table>"
+        )
+    scope1, location, market = rng.integers(10_000, 1_000_000, 3)
+    return (
+        f"<html><head><title>CDP {year}</title></head><body>"
+        f"<h1>CDP Climate Change Questionnaire {year + 1}</h1>"
+        f"<h2>C6. Emissions</h2>"
+        f"<p>(C6.1) What were your organization's gross global Scope 1 emissions in metric tons CO2e? {scope1:,}</p>"
+        f"<table><tr><th>Year</th><th>Scope 1 (metric tons CO2e)</th></tr><tr><td>Reporting year</td><td>{scope1}</td></tr></table>"
+        f"<h2>C6.3</h2><p>(C6.3) Scope 2 location-based {location:,}, market-based {market:,}</p>"
+        f"<p>(C6.5) Account for your organization's gross global Scope 3 emissions. Purchased goods and services {scope1 * 3:,}</p>"
+        f"{''.join(filler)}"
+        f"<h2>C8. Energy</h2>{energy}"
+        f"</body></html>"
+    )
+
+
+def pdf_escape(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def write_pdf(path, pages):
+    """Write a text-only PDF, one page per list of lines, without any PDF library"""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages:
+        stream = "BT /F1 9 Tf 11 TL 50 760 Td " + ' '.join(f"({pdf_escape(line)}) Tj T*" for line in lines) + " ET"
+        stream = stream.encode('latin-1', errors='replace')
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+            % (len(objects))
+        )
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b' '.join(b"%d 0 R" % k for k in kids), len(kids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b''.join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, 'wb') as f:
+        f.write(out)
+
+
+def report_pages(title, year, n_pages, mentions, lines_per_page=50):
+    """Page lines for a report: a repeated header and footer around filler text with occasional mentions"""
+    pages = []
+    for i in range(n_pages):
+        lines = [f"{title} {year}", '']
+        for j in range(lines_per_page):
+            if (i * lines_per_page + j) % 97 == 0:
+                mention = mentions[(i + j) % len(mentions)]
+                lines.append(f"{mention} for {year} was {stable_number(mention, year, i) % 100_000:,} million.")
+            else:
+                lines.append(f"{FILLER[:(j * 7) % 60 + 30]} Section {i + 1}.{j}")
+        lines += ['', f"{title} | Page {i + 1}"]
+        pages.append(lines)
+    return pages
+
+
+def annual_report_pdf(path, year, n_pages, parameters):
+    write_pdf(path, report_pages("Example Beverage Company Annual Report", year, n_pages, parameters))
+
+
+def cdp_report_pdf(path, year, n_pages):
+    questions = ["(C6.1) Scope 1 emissions", "(C6.3) Scope 2 emissions", "(C6.5) Scope 3 emissions", "(C8.2a) Energy use"]
+    write_pdf(path, report_pages(f"CDP Climate Change Questionnaire {year + 1}", year, n_pages, questions))
+
+
+def write_reports(folder, size, config_dict):
+    """CDP and annual report folders for one benchmark size; returns (cdp_folder, annual_folder, output_folder)"""
+    cdp_folder = os.path.join(folder, 'cdp')
+    annual_folder = os.path.join(folder, 'annual')
+    output_folder = os.path.join(folder, 'output')
+    for path in (cdp_folder, annual_folder, output_folder):
+        os.makedirs(path, exist_ok=True)
+    parameters = config_dict['annual_reports']['Parameter'].tolist()
+    first_year = 2023 - size['report_years']
+    for year in range(first_year, 2023):
+        with open(os.path.join(cdp_folder, f"cdp_{year}.html"), 'w') as f:
+            f.write(cdp_html(year, size['cdp_sections']))
+        annual_report_pdf(os.path.join(annual_folder, f"annual_report_{year}.pdf"), year, size['pdf_pages'], parameters)
+    cdp_report_pdf(os.path.join(cdp_folder, f"cdp_{first_year - 1}.pdf"), first_year - 1, size['pdf_pages'])
+    return cdp_folder, annual_folder, output_folder
+
+
+def emissions_frames(config_dict, years=10, activities=0, seed=0):
+    """The (df, predictors, pred_mat) inputs of get_ongil_ccf_estimates, shaped as CCFEstimatorCell builds them.
+
+    Each climate parameter is reported as a Total plus `activities` sub-activities, following a noisy
+    linear trend in its predictors, with a few values missing as in real extractions.
+    """
+    rng = np.random.default_rng(seed)
+    matrix = config_dict['Dependency Matrix']
+    predictor_names = config_dict['annual_reports']['Parameter'].tolist()
+    year_index = np.arange(2023 - years, 2023)
+
+    predictors = pd.DataFrame({'Year': year_index})
+    for name in predictor_names:
+        predictors[name] = np.round(rng.uniform(100, 1000) * (1 + 0.05 * np.arange(years)) * rng.uniform(0.9, 1.1, years), 2)
+
+    rows = []
+    activity_names = ['Total'] + [f"Activity {i + 1}" for i in range(activities)]
+    for scope, parameter in matrix[['Scope', 'Parameter']].itertuples(index=False):
+        units = 'MWh' if scope == 'Scope 2' and 'based' not in parameter.lower() else 'metric tonnes CO2e'
+        for activity in activity_names:
+            base = rng.uniform(1_000, 100_000)
+            values = base * (1 + 0.04 * np.arange(years)) * rng.uniform(0.85, 1.15, years)
+            values[rng.random(years) < 0.15] = np.nan
+            for year, value in zip(year_index, values):
+                rows.append((year, scope, parameter, activity, value, units))
+    df = pd.DataFrame(rows, columns=['Year', 'Scope', 'Parameter', 'Activity', 'Value', 'Units'])
+
+    pred_mat = (
+        df[['Scope', 'Parameter', 'Activity']]
+        .drop_duplicates()
+        .merge(matrix, on=['Scope', 'Parameter'])
+        .set_index(['Scope', 'Parameter', 'Activity'])
+        .astype(bool)
+    )
+    return df, predictors, pred_mat
@@ -1,7 +1,11 @@
 from abc import ABC, abstractmethod
+from django.urls import reverse
 from rest_framework.views import APIView
 from rest_framework.response import Response
 
+from .request_log import short_repr
+from .metrics import request_breakdown, span
+
 
 class BaseCell(ABC):
     @abstractmethod
@@ -23,8 +27,9 @@ class BaseCellView(APIView):
         logger = logging.getLogger(__name__)
         
         try:
-            # Log request data for debugging
-            logger.info(f"Received request data: {request.data}")
+            # Log request data for debugging; full data only for requests sampled by the logging middleware
+            if getattr(request, '_log_bodies', False):
+                logger.info(f"Received request data: {short_repr(request.data)}")
             
             if not request.data:
                 return Response({
@@ -45,54 +50,36 @@ class BaseCellView(APIView):
                     }
                 }, status=400)
             
-            try:
-                # Process the request
-                result = cell.process(request.data, request=request)
-                
-                # Validate response data
-                if not isinstance(result, dict):
-                    logger.error(f"Invalid response format: {result}")
-                    return Response({
-                        'data': {
-                            'tables': [],
-                            'error': 'Invalid response format from cell'
-                        }
-                    }, status=500)
-                
-                # Ensure response has the expected structure
-                if not isinstance(result, dict) or 'data' not in result:
-                    logger.error(f"Invalid response format: {result}")
+            if self.wants_async(request):
+                # Hand the work to the background pool and return straight away
+                from .jobs import job_manager, detach_request_data, JobQueueFull
+                try:
+                    job_id = job_manager.submit(
+                        self.cell_class.__name__, self.run_cell, cell, detach_request_data(request.data), request
+                    )
+                except JobQueueFull as e:
+                    logger.warning(str(e))
                     return Response({
                         'data': {
                             'tables': [],
-                            'error': 'Invalid response format from cell'
+                            'queue': job_manager.stats(),
+                            'error': str(e)
                         }
-                    }, status=500)
-
-                # Log successful response
-                logger.info("Successfully processed request")
-                logger.info(f"Response data: {result}")
-                
-                # Return the result directly since it already has the correct structure
-                return Response(result, status=200)
-                
-            except ValueError as e:
-                logger.error(f"Value error in cell processing: {str(e)}")
-                return Response({
-                    'data': {
-                        'tables': [],
-                        'error': str(e)
-                    }
-                }, status=400)
-            except Exception as e:
-                logger.error(f"Unexpected error in cell processing: {str(e)}", exc_info=True)
+                    }, status=503)
+                logger.info(f"Queued {self.cell_class.__name__} job {job_id}")
                 return Response({
                     'data': {
-                        'tables': [],
-                        'error': 'Internal server error while processing request'
+                        'job_id': job_id,
+                        'status': 'queued',
+                        'status_url': request.build_absolute_uri(reverse('cell_job_status', args=[job_id])),
+                        'queue': job_manager.stats(),
+                        'error': None
                     }
-                }, status=500)
-                
+                }, status=202)
+
+            result, status = self.run_cell(cell, request.data, request)
+            return Response(result, status=status)
+
         except Exception as e:
             logger.error(f"Base cell error: {str(e)}", exc_info=True)
             return Response({
@@ -101,3 +88,66 @@ class BaseCellView(APIView):
                     'error': 'Internal server error'
                 }
             }, status=500)
+
+    def wants_async(self, request):
+        return str(request.query_params.get('async', '')).lower() in ('1', 'true', 'yes')
+
+    def run_cell(self, cell, data, request):
+        """Run the cell and return the response payload with its status code"""
+        import logging
+        logger = logging.getLogger(__name__)
+
+        try:
+            # Process the request, collecting the time spent in each pipeline stage
+            with request_breakdown() as breakdown:
+                with span('cell'):
+                    result = cell.process(data, request=request)
+            
+            # Validate response data
+            if not isinstance(result, dict):
+                logger.error(f"Invalid response format: {result}")
+                return {
+                    'data': {
+                        'tables': [],
+                        'error': 'Invalid response format from cell'
+                    }
+                }, 500
+            
+            # Ensure response has the expected structure
+            if not isinstance(result, dict) or 'data' not in result:
+                logger.error(f"Invalid response format: {result}")
+                return {
+                    'data': {
+                        'tables': [],
+                        'error': 'Invalid response format from cell'
+                    }
+                }, 500
+
+            metadata = result['data'].get('metadata') if isinstance(result['data'], dict) else None
+            if isinstance(metadata, dict):
+                metadata['stages'] = breakdown.summary()
+
+            # Log successful response
+            logger.info(f"Successfully processed {type(cell).__name__} request")
+            if getattr(request, '_log_bodies', False):
+                logger.info(f"Response data: {short_repr(result)}")
+            
+            # Return the result directly since it already has the correct structure
+            return result, 200
+            
+        except ValueError as e:
+            logger.error(f"Value error in cell processing: {str(e)}")
+            return {
+                'data': {
+                    'tables': [],
+                    'error': str(e)
+                }
+            }, 400
+        except Exception as e:
+            logger.error(f"Unexpected error in cell processing: {str(e)}", exc_info=True)
+            return {
+                'data': {
+                    'tables': [],
+                    'error': 'Internal server error while processing request'
+                }
+            }, 500
@@ -0,0 +1,129 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def make_key(*parts):
+    """Hash any JSON-serialisable parts into a content address"""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class DiskCache:
+    """Content-addressed pickle store with a size bound (LRU eviction) and TTL expiry"""
+
+    def __init__(self, directory, max_bytes, ttl=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._size = None
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.pkl')
+
+    def get(self, key, default=None):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                created, value = pickle.load(f)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return default
+        except Exception as e:
+            # Truncated, corrupt or written by incompatible code (AttributeError, ImportError, ValueError, ...)
+            logger.warning(f"Dropping unreadable cache entry {path}: {type(e).__name__}: {str(e)}")
+            self.delete(key)
+            with self._lock:
+                self.misses += 1
+            return default
+        if self.ttl is not None and time.time() - created > self.ttl:
+            self.delete(key)
+            with self._lock:
+                self.misses += 1
+            return default
+        # Access time drives LRU eviction, so bump it on every hit
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def set(self, key, value):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump((time.time(), value), f, protocol=pickle.HIGHEST_PROTOCOL)
+        size = os.path.getsize(tmp_path)
+        old_size = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(tmp_path, path)
+        with self._lock:
+            if self._size is not None:
+                self._size += size - old_size
+            if self._size is None or self._size > self.max_bytes:
+                self._evict()
+
+    def delete(self, key):
+        path = self._path(key)
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except FileNotFoundError:
+            return
+        # Keep the running total rather than walking the directory again on the next set()
+        with self._lock:
+            if self._size is not None:
+                self._size = max(self._size - size, 0)
+
+    def _entries(self):
+        entries = []
+        if not os.path.isdir(self.directory):
+            return entries
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith('.pkl'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _evict(self):
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        self._size = total
+
+    def stats(self):
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._entries())
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'bytes': self._size,
+                'max_bytes': self.max_bytes,
+            }
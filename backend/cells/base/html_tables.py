@@ -0,0 +1,148 @@
+import csv
+import io
+import re
+
+import pandas as pd
+from lxml import etree
+from lxml.html import HTMLParser, fromstring
+from pandas.errors import EmptyDataError
+
+# Same cleanup and table rules as pd.read_html(flavor='lxml'), so frames built here match it
+WHITESPACE_RE = re.compile(r"[\r\n]+|\s{2,}")
+TEXT_RE = re.compile(r".+")
+
+
+def parse_html(text):
+    """Parse a document once so its tables can be read without going back to the file"""
+    doc = fromstring(text, parser=HTMLParser(recover=True))
+    for br in doc.xpath("*//br"):
+        br.tail = "\n" + (br.tail or "")
+    return doc
+
+
+def is_hidden(element):
+    return "display:none" in element.attrib.get("style", "").replace(" ", "")
+
+
+def first_text(element):
+    """The element's first text node, which is what XPath text() compares against"""
+    if element.text is not None:
+        return element.text
+    for child in element:
+        if child.tail is not None:
+            return child.tail
+    return None
+
+
+def has_text(table):
+    for element in table.iterdescendants(etree.Element):
+        text = first_text(element)
+        if text is not None and TEXT_RE.search(text):
+            return True
+    return False
+
+
+def find_tables(doc):
+    """Displayed tables holding any text, in document order.
+
+    read_html selects these with //table//*[re:test(text(), '.+')]/ancestor::table, which is
+    quadratic in the size of the document; checking each table's descendants once is linear.
+    """
+    tables = [t for t in doc.iter("table") if has_text(t) and not is_hidden(t)]
+    for table in tables:
+        strip_hidden(table)
+    return tables
+
+
+def strip_hidden(table):
+    """Remove display:none elements, as read_html does for displayed_only"""
+    for element in table.xpath(".//*[@style]"):
+        if is_hidden(element):
+            element.getparent().remove(element)
+
+
+def expand_rows(rows):
+    """Text of each <tr>, with rowspan/colspan cells copied into the positions they cover"""
+    all_texts = []
+    remainder = []
+    for tr in rows:
+        texts = []
+        next_remainder = []
+        index = 0
+        for td in tr.xpath("./td|./th"):
+            while remainder and remainder[0][0] <= index:
+                prev_i, prev_text, prev_rowspan = remainder.pop(0)
+                texts.append(prev_text)
+                if prev_rowspan > 1:
+                    next_remainder.append((prev_i, prev_text, prev_rowspan - 1))
+                index += 1
+            text = WHITESPACE_RE.sub(" ", td.text_content().strip())
+            rowspan = int(td.get("rowspan") or 1)
+            colspan = int(td.get("colspan") or 1)
+            for _ in range(colspan):
+                texts.append(text)
+                if rowspan > 1:
+                    next_remainder.append((index, text, rowspan - 1))
+                index += 1
+        for prev_i, prev_text, prev_rowspan in remainder:
+            texts.append(prev_text)
+            if prev_rowspan > 1:
+                next_remainder.append((prev_i, prev_text, prev_rowspan - 1))
+        all_texts.append(texts)
+        remainder = next_remainder
+
+    while remainder:
+        next_remainder = []
+        texts = []
+        for prev_i, prev_text, prev_rowspan in remainder:
+            texts.append(prev_text)
+            if prev_rowspan > 1:
+                next_remainder.append((prev_i, prev_text, prev_rowspan - 1))
+        all_texts.append(texts)
+        remainder = next_remainder
+    return all_texts
+
+
+def table_rows(table):
+    """Header, body and footer rows of a table as lists of text"""
+    header_rows = []
+    for thead in table.xpath(".//thead"):
+        header_rows.extend(thead.xpath("./tr"))
+        if thead.xpath("./td|./th"):
+            header_rows.append(thead)
+    body_rows = table.xpath(".//tbody//tr") + table.xpath("./tr")
+    footer_rows = table.xpath(".//tfoot//tr")
+
+    if not header_rows:
+        while body_rows and all(t.tag == "th" for t in body_rows[0].xpath("./td|./th")):
+            header_rows.append(body_rows.pop(0))
+    return expand_rows(header_rows), expand_rows(body_rows), expand_rows(footer_rows)
+
+
+def table_frame(table, header=None):
+    head, body, foot = table_rows(table)
+    if head:
+        body = head + body
+        if header is None:
+            header = 0 if len(head) == 1 else [i for i, row in enumerate(head) if any(text for text in row)]
+    if foot:
+        body += foot
+    # Pad ragged rows
+    width = max((len(row) for row in body), default=0)
+    body = [row + [""] * (width - len(row)) for row in body]
+    # read_html hands the rows to the python CSV parser, so reading them back as CSV infers the same types
+    buffer = io.StringIO()
+    csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC).writerows(body)
+    buffer.seek(0)
+    return pd.read_csv(buffer, engine="python", header=header, thousands=",")
+
+
+def read_tables(doc, header=None):
+    """pd.read_html over an already parsed document"""
+    frames = []
+    for table in find_tables(doc):
+        try:
+            frames.append(table_frame(table, header))
+        except EmptyDataError:
+            continue
+    return frames
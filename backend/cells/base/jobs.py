@@ -0,0 +1,149 @@
+import logging
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from django.core.files.uploadedfile import SimpleUploadedFile, UploadedFile
+from django.http import QueryDict
+from rest_framework.views import APIView
+from rest_framework.response import Response
+
+from config.settings import CELL_JOB_WORKERS, CELL_JOB_QUEUE_SIZE, CELL_JOB_RETENTION
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class JobManager:
+    """Bounded local worker pool that runs cell jobs off the request thread."""
+
+    def __init__(self, max_workers, max_queued, retention):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.retention = retention
+        self._executor = None
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+        self._queued = 0
+        self._running = 0
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='cell-job')
+        return self._executor
+
+    def submit(self, name, func, *args, **kwargs):
+        with self._lock:
+            if self._queued >= self.max_queued:
+                raise JobQueueFull(f"Job queue is full ({self.max_queued} jobs waiting)")
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {
+                'job_id': job_id,
+                'cell': name,
+                'status': 'queued',
+                'submitted_at': datetime.now().isoformat(),
+                'started_at': None,
+                'finished_at': None,
+                'status_code': None,
+                'result': None,
+            }
+            self._queued += 1
+            self._evict_finished()
+            executor = self._get_executor()
+        executor.submit(self._run, job_id, func, args, kwargs)
+        return job_id
+
+    def _run(self, job_id, func, args, kwargs):
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+            job = self._jobs[job_id]
+            job['status'] = 'running'
+            job['started_at'] = datetime.now().isoformat()
+        try:
+            result, status_code = func(*args, **kwargs)
+            status = 'completed' if status_code < 400 else 'failed'
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {str(e)}", exc_info=True)
+            result = {
+                'data': {
+                    'tables': [],
+                    'error': 'Internal server error while processing request'
+                }
+            }
+            status_code = 500
+            status = 'failed'
+        with self._lock:
+            self._running -= 1
+            job['status'] = status
+            job['status_code'] = status_code
+            job['result'] = result
+            job['finished_at'] = datetime.now().isoformat()
+
+    def _evict_finished(self):
+        finished = [k for k, v in self._jobs.items() if v['status'] in ('completed', 'failed')]
+        for job_id in finished[:max(len(finished) - self.retention, 0)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'queue_depth': self._queued,
+                'running': self._running,
+                'workers': self.max_workers,
+                'capacity': self.max_workers + self.max_queued,
+                'available': self.max_workers + self.max_queued - self._queued - self._running,
+            }
+
+
+job_manager = JobManager(CELL_JOB_WORKERS, CELL_JOB_QUEUE_SIZE, CELL_JOB_RETENTION)
+
+
+def _detach_value(value):
+    # Uploaded files are closed once the request finishes, so copy them into memory
+    if isinstance(value, UploadedFile):
+        value.seek(0)
+        return SimpleUploadedFile(value.name, value.read(), value.content_type)
+    return value
+
+
+def detach_request_data(data):
+    """Copy request data so it outlives the request that carried it"""
+    if isinstance(data, QueryDict):
+        detached = QueryDict(mutable=True)
+        for key, values in data.lists():
+            detached.setlist(key, [_detach_value(v) for v in values])
+        return detached
+    return {k: _detach_value(v) for k, v in data.items()}
+
+
+class JobStatusView(APIView):
+
+    def get(self, request, job_id=None):
+        if job_id is None:
+            return Response({'data': {'queue': job_manager.stats(), 'error': None}}, status=200)
+
+        job = job_manager.get(job_id)
+        if job is None:
+            return Response({
+                'data': {
+                    'job_id': job_id,
+                    'error': 'Unknown job id'
+                }
+            }, status=404)
+
+        result = job.pop('result')
+        job['result'] = result['data'] if result is not None else None
+        job['queue'] = job_manager.stats()
+        job['error'] = job['result'].get('error') if isinstance(job['result'], dict) else None
+        return Response({'data': job}, status=200)
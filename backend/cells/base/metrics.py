@@ -0,0 +1,241 @@
+import contextvars
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from django.http import HttpResponse
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, n=1, **labels):
+        key = tuple(str(labels.get(label, '')) for label in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + n
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{format_labels(self.labels, key)} {value}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def set(self, value, **labels):
+        key = tuple(str(labels.get(label, '')) for label in self.labels)
+        with self._lock:
+            self._values[key] = value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{format_labels(self.labels, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(label, '')) for label in self.labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float('inf'),), counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(float(bound))
+                    lines.append(f"{self.name}_bucket{format_labels(self.labels + ('le',), key + (le,))} {cumulative}")
+                lines.append(f"{self.name}_sum{format_labels(self.labels, key)} {total}")
+                lines.append(f"{self.name}_count{format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+def escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(f'{name}="{escape_label(value)}"' for name, value in zip(names, values))
+    return '{' + pairs + '}'
+
+
+STAGE_SECONDS = Histogram('cell_stage_seconds', 'Time spent in each pipeline stage', ('stage',))
+HTTP_REQUESTS = Counter('http_requests_total', 'HTTP requests handled', ('method', 'status'))
+HTTP_SECONDS = Histogram('http_request_duration_seconds', 'HTTP request duration', ('method',))
+LLM_REQUESTS = Counter('llm_requests_total', 'Chat completion requests sent upstream', ('status',))
+LLM_SECONDS = Histogram('llm_request_seconds', 'Upstream chat completion latency')
+LLM_TOKENS = Counter('llm_tokens_total', 'Tokens used by chat completions', ('kind',))
+LLM_RETRIES = Counter('llm_retries_total', 'extract_values retries after a failed attempt')
+LLM_IN_FLIGHT = Gauge('llm_requests_in_flight', 'Chat completion requests sent upstream and not yet answered')
+LLM_WAITING = Gauge('llm_requests_waiting', 'Distinct chat completion requests waiting for an in-flight slot')
+LLM_LATENCY = Gauge('llm_recent_latency_seconds', 'Latency of the last 1000 chat completions', ('stat',))
+LLM_CONNECTIONS = Gauge('llm_connections', 'LLM connection pool limit and connections in use', ('state',))
+LLM_CACHE = Counter('llm_cache_lookups_total', 'LLM response cache lookups', ('result',))
+PDF_PAGES = Counter('pdf_pages_total', 'PDF pages extracted to text')
+DOCUMENT_BYTES = Counter('document_bytes_total', 'Bytes of uploaded documents processed', ('kind',))
+CCF_SERIES = Counter('ccf_series_total', 'CCF series estimated, by whether their cached fit was reused', ('fit',))
+
+REGISTRY = [
+    STAGE_SECONDS, HTTP_REQUESTS, HTTP_SECONDS, LLM_REQUESTS, LLM_SECONDS, LLM_TOKENS, LLM_RETRIES,
+    LLM_IN_FLIGHT, LLM_WAITING, LLM_LATENCY, LLM_CONNECTIONS, LLM_CACHE, PDF_PAGES, DOCUMENT_BYTES, CCF_SERIES,
+]
+
+
+class StageBreakdown:
+    """Seconds and entry counts per stage for one request, summed across its worker threads"""
+
+    def __init__(self):
+        self._stages = {}
+        self._open = {}
+        self._active = set()
+        self._lock = threading.Lock()
+
+    def enter(self, stage):
+        with self._lock:
+            self._open[stage] = self._open.get(stage, 0) + 1
+            self._active.add(stage)
+
+    def add(self, stage, seconds):
+        with self._lock:
+            entry = self._stages.setdefault(stage, {'seconds': 0.0, 'count': 0})
+            entry['seconds'] += seconds
+            entry['count'] += 1
+            if self._open.get(stage):
+                self._open[stage] -= 1
+
+    def drain_active(self):
+        """Stages that were running at any point since the previous call"""
+        with self._lock:
+            active = self._active
+            self._active = {stage for stage, n in self._open.items() if n}
+            return active
+
+    def summary(self):
+        with self._lock:
+            return {stage: {'seconds': round(v['seconds'], 4), 'count': v['count']} for stage, v in self._stages.items()}
+
+
+_breakdown = contextvars.ContextVar('stage_breakdown', default=None)
+
+
+@contextmanager
+def request_breakdown():
+    """Collect the stage timings of everything run inside the block"""
+    breakdown = StageBreakdown()
+    token = _breakdown.set(breakdown)
+    try:
+        yield breakdown
+    finally:
+        _breakdown.reset(token)
+
+
+def record(stage, seconds):
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    breakdown = _breakdown.get()
+    if breakdown is not None:
+        breakdown.add(stage, seconds)
+
+
+def enter(stage):
+    breakdown = _breakdown.get()
+    if breakdown is not None:
+        breakdown.enter(stage)
+
+
+@contextmanager
+def span(stage):
+    enter(stage)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start)
+
+
+def timed(stage):
+    """Decorator form of span"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def timed_iter(iterable, stage):
+    """Yield from iterable, recording only the time spent producing items, as one observation"""
+    iterator = iter(iterable)
+    elapsed = 0.0
+    enter(stage)
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                elapsed += time.perf_counter() - start
+            yield item
+    finally:
+        record(stage, elapsed)
+
+
+def propagate(func):
+    """Carry the caller's stage breakdown into a function run on another thread"""
+    breakdown = _breakdown.get()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        token = _breakdown.set(breakdown)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _breakdown.reset(token)
+    return wrapper
+
+
+def render():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    return HttpResponse(render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,43 @@
+import hashlib
+import random
+import reprlib
+
+from config.settings import REQUEST_LOG_MODE, REQUEST_LOG_BODY_CAP, REQUEST_LOG_SAMPLE_RATE
+
+REDACTED_HEADERS = {'authorization', 'cookie', 'x-api-key', 'x-csrftoken'}
+
+# Bounded repr for request.data and cell results, so large payloads are never formatted in full
+_repr = reprlib.Repr()
+_repr.maxlevel = 4
+_repr.maxdict = 12
+_repr.maxlist = 8
+_repr.maxstring = 200
+_repr.maxother = 200
+
+
+def sample_bodies():
+    """Whether this request's bodies get logged"""
+    if REQUEST_LOG_MODE == 'full':
+        return True
+    if REQUEST_LOG_MODE == 'off' or REQUEST_LOG_SAMPLE_RATE <= 0:
+        return False
+    return random.random() < REQUEST_LOG_SAMPLE_RATE
+
+
+def body_for_log(body, content_type=''):
+    """Body text capped at REQUEST_LOG_BODY_CAP bytes, with the size and a hash of anything longer"""
+    if content_type.startswith('multipart/'):
+        return f"<multipart {len(body)} bytes>"
+    if len(body) <= REQUEST_LOG_BODY_CAP:
+        return body.decode('utf-8', errors='replace')
+    digest = hashlib.sha256(body).hexdigest()[:16]
+    head = body[:REQUEST_LOG_BODY_CAP].decode('utf-8', errors='replace')
+    return f"{head}... <{len(body)} bytes, sha256 {digest}>"
+
+
+def headers_for_log(headers):
+    return {k: ('<redacted>' if k.lower() in REDACTED_HEADERS else v) for k, v in headers.items()}
+
+
+def short_repr(obj):
+    return _repr.repr(obj)
@@ -0,0 +1,94 @@
+import re
+import uuid
+
+import pandas as pd
+from rest_framework.views import APIView
+from rest_framework.response import Response
+
+from config.settings import RESULT_CACHE_DIR, RESULT_CACHE_MAX_BYTES, RESULT_CACHE_TTL, RESULT_PAGE_SIZE
+from .disk_cache import DiskCache
+
+RESULT_ID_RE = re.compile(r'[0-9a-f]{32}')
+
+result_cache = DiskCache(RESULT_CACHE_DIR, RESULT_CACHE_MAX_BYTES, RESULT_CACHE_TTL)
+
+
+def encode_column(name, series):
+    """One column of the columnar format: typed values, or codes into a shared dictionary for repeated strings"""
+    if pd.api.types.is_bool_dtype(series):
+        return {'name': name, 'type': 'bool', 'values': series.tolist()}
+    if pd.api.types.is_integer_dtype(series):
+        return {'name': name, 'type': 'int', 'values': series.tolist()}
+    if pd.api.types.is_float_dtype(series):
+        values = series.astype(object).where(series.notna(), None) if series.hasnans else series
+        return {'name': name, 'type': 'float', 'values': values.tolist()}
+    if pd.api.types.is_datetime64_any_dtype(series):
+        values = series.dt.strftime('%Y-%m-%dT%H:%M:%S')
+        return {'name': name, 'type': 'datetime', 'values': values.astype(object).where(series.notna(), None).tolist()}
+
+    series = series.where(series.isna(), series.astype(str))
+    codes, dictionary = pd.factorize(series)
+    missing = codes < 0
+    if len(dictionary) * 2 > len(series):
+        values = series.astype(object).where(~missing, None)
+        return {'name': name, 'type': 'string', 'values': values.tolist()}
+    codes = codes.tolist()
+    if missing.any():
+        codes = [None if c < 0 else c for c in codes]
+    return {'name': name, 'type': 'string', 'dictionary': dictionary.tolist(), 'codes': codes}
+
+
+def encode_columns(frame, names=None):
+    if names is None:
+        names = frame.columns.tolist()
+    return [encode_column(name, frame.iloc[:, i]) for i, name in enumerate(names)]
+
+
+def columnar_page(result_id, frame, names, offset=0, limit=None):
+    if limit is None:
+        limit = RESULT_PAGE_SIZE
+    return {
+        'format': 'columnar',
+        'result_id': result_id,
+        'row_count': len(frame),
+        'offset': offset,
+        'limit': limit,
+        'columns': encode_columns(frame.iloc[offset:offset + limit], names),
+    }
+
+
+def table_payload(frame, names=None, limit=None):
+    """Cache the full table and return its first page; later pages come from ResultPageView"""
+    if names is None:
+        names = frame.columns.tolist()
+    result_id = uuid.uuid4().hex
+    result_cache.set(result_id, {'frame': frame, 'names': names})
+    return columnar_page(result_id, frame, names, 0, limit)
+
+
+class ResultPageView(APIView):
+
+    def get(self, request, result_id=None):
+        # Ids are used as cache file names, so only ever look up ones this module could have issued
+        result = result_cache.get(result_id) if RESULT_ID_RE.fullmatch(result_id or '') else None
+        if result is None:
+            return Response({
+                'data': {
+                    'result_id': result_id,
+                    'error': 'Unknown or expired result id'
+                }
+            }, status=404)
+        try:
+            offset = max(int(request.query_params.get('offset', 0)), 0)
+            limit = max(int(request.query_params.get('limit', RESULT_PAGE_SIZE)), 1)
+        except ValueError:
+            return Response({
+                'data': {
+                    'result_id': result_id,
+                    'error': 'offset and limit must be integers'
+                }
+            }, status=400)
+
+        page = columnar_page(result_id, result['frame'], result['names'], offset, limit)
+        page['error'] = None
+        return Response({'data': page}, status=200)
@@ -8,7 +8,34 @@ class FileUploadSerializer(serializers.Serializer):
         allow_empty=False,
         write_only=True
     )
+    use_cache = serializers.BooleanField(required=False, default=True)
 
 
 class SessionIdSerializer(serializers.Serializer):
     session_id = serializers.CharField(max_length=255, required=True)
+
+
+class TableFormatSerializer(serializers.Serializer):
+    # "columnar" returns typed columns and the first `limit` rows; the rest are paged from the results endpoint
+    format = serializers.ChoiceField(choices=['rows', 'columnar'], required=False, default='rows')
+    limit = serializers.IntegerField(required=False, min_value=1)
+
+
+class EstimatorSerializer(SessionIdSerializer):
+    # Company named in the explainability text
+    company = serializers.CharField(max_length=255, required=False)
+
+
+class WhatIfEstimatorSerializer(EstimatorSerializer):
+    # {predictor: {year: value}} to predict from instead of the annual report values
+    what_if = serializers.DictField(
+        child=serializers.DictField(child=serializers.FloatField(), allow_empty=False),
+        required=False,
+        allow_empty=False
+    )
+
+
+class BatchEstimatorSerializer(serializers.Serializer):
+    # Session the combined workbook is written under
+    session_id = serializers.CharField(max_length=255, required=True)
+    companies = serializers.ListField(child=EstimatorSerializer(), allow_empty=False)
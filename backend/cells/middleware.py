@@ -1,39 +1,49 @@
 import logging
-import json
+import time
 from django.utils.deprecation import MiddlewareMixin
 
+from config.settings import REQUEST_LOG_MODE
+from cells.base.request_log import sample_bodies, body_for_log, headers_for_log
+from cells.base.metrics import HTTP_REQUESTS, HTTP_SECONDS
+
 logger = logging.getLogger(__name__)
 
 class RequestResponseLoggingMiddleware(MiddlewareMixin):
     def process_request(self, request):
+        request._log_start = time.monotonic()
+        # Decided once per request, so the cell view logs the same request's data too
+        request._log_bodies = sample_bodies()
         try:
-            # Log request details
-            logger.info(f"Request Method: {request.method}")
-            logger.info(f"Request Path: {request.path}")
-            logger.info(f"Request Headers: {dict(request.headers)}")
-            
-            if request.body:
-                try:
-                    body = json.loads(request.body)
-                    logger.info(f"Request Body: {body}")
-                except json.JSONDecodeError:
-                    logger.info("Request Body: <non-JSON data>")
+            if request._log_bodies:
+                logger.info(f"Request Headers: {headers_for_log(request.headers)}")
+                # Uploads are described, never read into the log
+                content_type = request.content_type or ''
+                if content_type.startswith('multipart/'):
+                    logger.info(f"Request Body: <multipart {request.META.get('CONTENT_LENGTH') or 0} bytes>")
+                elif request.body:
+                    logger.info(f"Request Body: {body_for_log(request.body, content_type)}")
         except Exception as e:
             logger.error(f"Error logging request: {str(e)}")
         return None
 
     def process_response(self, request, response):
         try:
-            # Log response details
-            logger.info(f"Response Status: {response.status_code}")
-            logger.info(f"Response Headers: {dict(response.headers)}")
-            
-            if hasattr(response, 'content'):
-                try:
-                    content = json.loads(response.content)
-                    logger.info(f"Response Content: {content}")
-                except json.JSONDecodeError:
-                    logger.info("Response Content: <non-JSON data>")
+            duration = time.monotonic() - getattr(request, '_log_start', time.monotonic())
+            HTTP_REQUESTS.inc(method=request.method, status=response.status_code)
+            HTTP_SECONDS.observe(duration, method=request.method)
+            if REQUEST_LOG_MODE == 'off':
+                return response
+            duration_ms = duration * 1000
+            request_bytes = request.META.get('CONTENT_LENGTH') or 0
+            response_bytes = '-' if response.streaming else len(response.content)
+            logger.info(
+                f"{request.method} {request.path} status={response.status_code} "
+                f"duration_ms={duration_ms:.1f} request_bytes={request_bytes} response_bytes={response_bytes}"
+            )
+
+            if getattr(request, '_log_bodies', False) and not response.streaming:
+                logger.info(f"Response Headers: {dict(response.headers)}")
+                logger.info(f"Response Content: {body_for_log(response.content, response.get('Content-Type', ''))}")
         except Exception as e:
             logger.error(f"Error logging response: {str(e)}")
         return response
@@ -0,0 +1,133 @@
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pandas as pd
+
+from cells.base.metrics import CCF_SERIES
+from config.settings import CCF_ESTIMATE_PROCESSES
+from .get_ccf_data import read_estimator_inputs, estimate_company
+from .ccf_models import load_models, save_models, fit_counts
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Process pool for per-company estimation, started on first use"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                # spawn avoids forking the multi-threaded web worker
+                _executor = ProcessPoolExecutor(
+                    max_workers=CCF_ESTIMATE_PROCESSES,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+    return _executor
+
+
+def reset_executor(executor):
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def estimate_session(session_id, cdp_report_path, annual_report_path, config_dict, company):
+    """Read and estimate one company; runs in a pool worker, so only frames and counts cross the process boundary.
+
+    Returns the estimates, dependencies and explanation, and how many series were fitted and reused.
+    """
+    df, predictors = read_estimator_inputs(cdp_report_path, annual_report_path)
+    # The session's fitted models are reused and refreshed here, next to the fit
+    models = load_models(session_id)
+    before = dict(models)
+    estimates, pred_mat, chk = estimate_company(df, predictors, config_dict, company, models)
+    save_models(session_id, models)
+    return estimates, pred_mat.join(chk), chk, fit_counts(before, models)
+
+
+def estimate_companies(items, config_dict, processes=None):
+    """Estimate every item ({'session_id', 'company', 'cdp_report_path', 'annual_report_path'}) in order.
+
+    Each result holds the company's estimates, dependencies and explanation, or its error. Companies
+    run across the process pool; if the pool dies the rest are estimated inline.
+    """
+    if processes is None:
+        processes = CCF_ESTIMATE_PROCESSES
+    # A plain dict of the sheets, so it pickles to the workers
+    config_dict = dict(config_dict)
+    args = [(item['session_id'], item['cdp_report_path'], item['annual_report_path'], config_dict, item['company']) for item in items]
+    outcomes = [None] * len(items)
+
+    if processes > 1 and len(items) > 1:
+        executor = get_executor()
+        futures = [executor.submit(estimate_session, *a) for a in args]
+        try:
+            for i, future in enumerate(futures):
+                try:
+                    outcomes[i] = ('ok', future.result())
+                    # A worker's own metrics never reach this process, so its series are counted here
+                    for fit, count in outcomes[i][1][3].items():
+                        CCF_SERIES.inc(count, fit=fit)
+                except BrokenProcessPool:
+                    raise
+                except Exception as e:
+                    outcomes[i] = ('error', e)
+        except BrokenProcessPool as e:
+            logger.error(f"Estimation worker pool failed, estimating the remaining companies inline: {str(e)}")
+            reset_executor(executor)
+
+    for i, a in enumerate(args):
+        if outcomes[i] is not None:
+            continue
+        try:
+            outcomes[i] = ('ok', estimate_session(*a))
+        except Exception as e:
+            outcomes[i] = ('error', e)
+
+    results = []
+    for item, (status, value) in zip(items, outcomes):
+        if status == 'error':
+            logger.error(f"Estimation failed for {item['company']}: {str(value)}")
+            results.append({'company': item['company'], 'error': str(value)})
+            continue
+        estimates, dependencies, explanation, _ = value
+        results.append({
+            'company': item['company'],
+            'estimates': estimates,
+            'dependencies': dependencies,
+            'explanation': explanation,
+            'error': None
+        })
+    return results
+
+
+def combine_results(results):
+    """Estimates, dependencies and explanations of all estimated companies, each tagged with a Company column"""
+    done = [r for r in results if r['error'] is None]
+    if not done:
+        return None, None, None
+    estimates = pd.concat([r['estimates'].assign(Company=r['company']) for r in done], ignore_index=True)
+    dependencies = pd.concat([r['dependencies'].reset_index().assign(Company=r['company']) for r in done], ignore_index=True)
+    explanation = pd.concat([r['explanation'].reset_index().assign(Company=r['company']) for r in done], ignore_index=True)
+    # Company first, then the columns the single-company output already has
+    estimates = estimates[['Company'] + [c for c in estimates.columns if c != 'Company']]
+    dependencies = dependencies[['Company'] + [c for c in dependencies.columns if c != 'Company']]
+    explanation = explanation[['Company'] + [c for c in explanation.columns if c != 'Company']]
+    return estimates, dependencies, explanation
+
+
+def write_batch_output(path, summary, estimates, dependencies):
+    """One workbook for the whole batch: per-company status plus the combined estimates and dependencies"""
+    with pd.ExcelWriter(path) as writer:
+        summary.to_excel(writer, sheet_name='Companies', index=False)
+        if estimates is not None:
+            estimates.to_excel(writer, sheet_name='Data', index=False)
+            dependencies.to_excel(writer, sheet_name='Dependencies', index=False)
@@ -0,0 +1,94 @@
+import hashlib
+import json
+import logging
+
+import numpy as np
+
+from cells.base.disk_cache import DiskCache, make_key
+from cells.base.metrics import CCF_SERIES
+from config.settings import CCF_MODEL_CACHE_DIR, CCF_MODEL_CACHE_MAX_BYTES, CCF_MODEL_CACHE_TTL
+from .wls import fit_candidates
+
+logger = logging.getLogger(__name__)
+
+model_cache = DiskCache(CCF_MODEL_CACHE_DIR, CCF_MODEL_CACHE_MAX_BYTES, CCF_MODEL_CACHE_TTL)
+
+
+def models_key(session_id):
+    return make_key('ccf_models', session_id)
+
+
+def load_models(session_id):
+    """Fitted series of a session's last estimate, {(Scope, Parameter, Activity, Units): model}"""
+    return model_cache.get(models_key(session_id), {})
+
+
+def save_models(session_id, models):
+    model_cache.set(models_key(session_id), models)
+
+
+def series_key(names, x, y, w):
+    """Hash of everything a series' fit depends on: its candidates and the weighted points where it is reported.
+
+    Years the series does not report only affect its predictions, so adding one reuses the fit.
+    """
+    present = ~np.isnan(y)
+    h = hashlib.sha256(json.dumps(names).encode())
+    for values in (y[present], x[:, present], w[present]):
+        h.update(np.ascontiguousarray(values, dtype=float).tobytes())
+    return h.hexdigest()
+
+
+def fit_series(xdata, ydata, weights, names, candidates, labels, models):
+    """Slopes and scores of every series' candidates, fitting only the series whose inputs changed.
+
+    candidates holds predictor rows of xdata per series and labels the series themselves. Cached fits in
+    models are reused while their key still matches; models is updated in place to the current series,
+    with a new entry for every series fitted. Returns slopes, scores and the number of series fitted.
+    """
+    width = max((len(c) for c in candidates), default=0)
+    slopes = np.full((len(labels), width), np.nan)
+    scores = np.full((len(labels), width), np.nan)
+    keys = []
+    stale = []
+    for i, (label, rows) in enumerate(zip(labels, candidates)):
+        cand_names = [names[r] for r in rows]
+        key = series_key(cand_names, xdata[rows], ydata[i], weights)
+        keys.append(key)
+        model = models.get(label)
+        if model is not None and model['candidates'] == cand_names and model['key'] == key:
+            slopes[i, :len(rows)] = model['slopes']
+            scores[i, :len(rows)] = model['scores']
+        else:
+            stale.append(i)
+
+    if stale:
+        new_slopes, new_scores = fit_candidates(xdata, ydata[stale], weights, [candidates[i] for i in stale])
+        for j, i in enumerate(stale):
+            n = len(candidates[i])
+            slopes[i, :n] = new_slopes[j, :n]
+            scores[i, :n] = new_scores[j, :n]
+            cand_names = [names[r] for r in candidates[i]]
+            fitted = ~np.isnan(new_scores[j, :n])
+            # The last of the best-scoring candidates is the one whose predictions win
+            best = cand_names[n - 1 - int(np.nanargmax(new_scores[j, :n][::-1]))] if fitted.any() else None
+            models[labels[i]] = {
+                'key': keys[i],
+                'candidates': cand_names,
+                'slopes': new_slopes[j, :n].copy(),
+                'scores': new_scores[j, :n].copy(),
+                'best': best,
+            }
+    # Series no longer reported are dropped, so the cache follows the latest data
+    for label in set(models).difference(labels):
+        del models[label]
+    CCF_SERIES.inc(len(stale), fit='fitted')
+    CCF_SERIES.inc(len(labels) - len(stale), fit='reused')
+    logger.info(f"CCF models: {len(stale)} series fitted, {len(labels) - len(stale)} reused")
+    return slopes, scores, len(stale)
+
+
+def fit_counts(before, models):
+    """Series fitted and reused since models was a copy of before; a refitted series has a new entry"""
+    fitted = sum(1 for label, model in models.items() if before.get(label) is not model)
+    return {'fitted': fitted, 'reused': len(models) - fitted}
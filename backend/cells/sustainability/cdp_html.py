@@ -0,0 +1,55 @@
+import re
+from bisect import bisect_left
+from collections import defaultdict
+
+from cells.base.html_tables import parse_html, read_tables
+
+# Heading tags, CDP question codes like (C6.1) and chapter markers like "C8." or "C6. Emissions".
+# The lookahead finds overlapping markers, e.g. the "C8." inside "(C8.2)", just as str.split would.
+MARKER_RE = re.compile(r"(?=(<h1|</h1|<h2|\(C\d{1,2}\.\d{1,2}[a-z]{0,2}\)|(C\d{1,2}\.)( [A-Z][a-z]+)?))")
+
+
+class CDPHtmlIndex:
+    """Offsets of headings and question codes in a CDP HTML export, found in one scan.
+
+    Sections are sliced straight out of the raw text, so the scope extractions send exactly
+    what splitting the text on the same markers would. Tables are parsed once, on first use.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.positions = defaultdict(list)
+        for match in MARKER_RE.finditer(text):
+            pos = match.start()
+            if match.group(2) is None:
+                self.positions[match.group(1)].append(pos)
+                continue
+            self.positions[match.group(2)].append(pos)
+            if match.group(3) is not None:
+                self.positions[match.group(2) + match.group(3)].append(pos)
+        self._tables = None
+
+    def section(self, start, end):
+        """Same as text.split(start)[1].split(end)[0]"""
+        starts = self.positions.get(start, [])
+        if len(starts) == 0:
+            raise IndexError(f"{start} not found")
+        begin = starts[0] + len(start)
+        stop = starts[1] if len(starts) > 1 else len(self.text)
+        ends = self.positions.get(end, [])
+        i = bisect_left(ends, begin)
+        if i < len(ends) and ends[i] + len(end) <= stop:
+            stop = ends[i]
+        return self.text[begin:stop]
+
+    def reporting_year(self):
+        try:
+            return int(self.section("<h1", "</h1")[-4:]) - 1
+        except:
+            return "0000"
+
+    def tables(self):
+        """Frames for every table in the document, as pd.read_html(header=0) returns them"""
+        if self._tables is None:
+            self._tables = read_tables(parse_html(self.text), header=0)
+        return self._tables
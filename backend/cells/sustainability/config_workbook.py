@@ -0,0 +1,122 @@
+import hashlib
+import io
+import logging
+import os
+import tempfile
+import threading
+from types import MappingProxyType
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+SCOPES = ('Scope 1', 'Scope 2', 'Scope 3')
+REQUIRED_SHEETS = ('climate_reports', 'annual_reports', 'Dependency Matrix')
+
+
+class ConfigWorkbook:
+    """The parameter configuration workbook, parsed once.
+
+    The frames are shared by every request that uses this version of the workbook, so they are read only:
+    MappingProxyType only stops sheets being swapped, so callers filter, merge or copy them and never
+    assign into them or modify them in place.
+    """
+
+    def __init__(self, content, path=None):
+        self.path = path
+        self.sha256 = hashlib.sha256(content).hexdigest()
+        sheets = pd.read_excel(io.BytesIO(content), sheet_name=None)
+        missing = [name for name in REQUIRED_SHEETS if name not in sheets]
+        if missing:
+            raise ValueError(f"Config workbook has no {', '.join(missing)} sheet")
+        self.sheets = MappingProxyType(sheets)
+        # CDP parameters by scope, annual report predictors, and which predictors each CDP parameter uses
+        self.climate_parameters = sheets['climate_reports']
+        self.annual_parameters = sheets['annual_reports']
+        self.dependency_matrix = sheets['Dependency Matrix']
+        self.scope_parameters = MappingProxyType({
+            scope: self.climate_parameters[self.climate_parameters['Scope'] == scope] for scope in SCOPES
+        })
+        self.annual_context = self.annual_parameters.to_string(index=False)
+
+
+def file_signature(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+class ConfigProvider:
+    """The workbook at path, parsed again only when the file changes.
+
+    Every get() stats the file; a new mtime, size or inode has its content hashed, and only a new hash
+    is parsed. Parsing happens under a lock, so concurrent requests never parse the same version twice.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._workbook = None
+        self._signature = None
+        self.loads = 0
+
+    def get(self):
+        signature = file_signature(self.path)
+        workbook = self._workbook
+        if workbook is not None and self._signature == signature:
+            return workbook
+        with self._lock:
+            if self._workbook is not None and self._signature == signature:
+                return self._workbook
+            with open(self.path, 'rb') as f:
+                content = f.read()
+            if self._workbook is None or self._workbook.sha256 != hashlib.sha256(content).hexdigest():
+                self._workbook = ConfigWorkbook(content, self.path)
+                self.loads += 1
+                logger.info(f"Loaded config workbook {self.path} ({self._workbook.sha256[:12]})")
+            # A replacement after the stat only makes the next get() look again
+            self._signature = signature
+            return self._workbook
+
+    def replace(self, content):
+        """Validate and install a new workbook; readers see either the old file or the new one, never part of it"""
+        workbook = ConfigWorkbook(content, self.path)
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(content)
+            with self._lock:
+                os.replace(tmp_path, self.path)
+                self._workbook = workbook
+                self._signature = file_signature(self.path)
+                self.loads += 1
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return workbook
+
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+def config_provider(path):
+    path = os.path.abspath(path)
+    with _providers_lock:
+        if path not in _providers:
+            _providers[path] = ConfigProvider(path)
+        return _providers[path]
+
+
+def load_config(path):
+    """The parsed config workbook at path, from memory unless the file changed.
+
+    Every caller gets the same workbook, so its frames must not be modified; copy one before changing it.
+    """
+    return config_provider(path).get()
+
+
+def replace_config(path, content):
+    return config_provider(path).replace(content)
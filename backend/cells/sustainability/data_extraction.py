@@ -1,20 +1,37 @@
-import re
 import os
+import logging
+import hashlib
+import queue
+import threading
 from pathlib import Path
 import pandas as pd
 from tqdm import tqdm
 import json
-from openai import OpenAI, AzureOpenAI
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import numpy as np
-import pdfplumber
 from tenacity import retry
 from tenacity import wait_exponential, stop_after_attempt
-from decouple import config
 
-open_api_key = config("OPEN_API_KEY")
-api_version = config("API_VERSION")
-azure_endpoint = config("AZURE_ENDPOINT")
-deployment = config("DEPLOYMENT")
+from cells.base.disk_cache import DiskCache, make_key
+from cells.base.metrics import span, timed, timed_iter, propagate
+from cells.base.metrics import LLM_CACHE, LLM_RETRIES, PDF_PAGES, DOCUMENT_BYTES
+from config.settings import LLM_CACHE_DIR, LLM_CACHE_MAX_BYTES, LLM_CACHE_TTL
+from config.settings import DOCUMENT_CACHE_DIR, DOCUMENT_CACHE_MAX_BYTES, DOCUMENT_CACHE_TTL
+from config.settings import EXTRACTION_CONCURRENCY, EXTRACTION_MODE, MAP_REDUCE_CONCURRENCY
+from config.settings import RELEVANCE_PAGES_PER_PARAMETER, RELEVANCE_NEIGHBOURS, BOILERPLATE_MIN_PAGES
+from .llm_gateway import SYSTEM_PROMPT, get_deployment, get_gateway
+from .pdf_text import iter_pdf_pages, PageSpool
+from .question_index import QuestionIndex
+from .cdp_html import CDPHtmlIndex
+from .config_workbook import load_config
+from .text_normalise import PageNormaliser
+from .relevance import parameter_queries, query_terms, PageIndex
+
+llm_cache = DiskCache(LLM_CACHE_DIR, LLM_CACHE_MAX_BYTES, LLM_CACHE_TTL)
+document_cache = DiskCache(DOCUMENT_CACHE_DIR, DOCUMENT_CACHE_MAX_BYTES, DOCUMENT_CACHE_TTL)
+_stats_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
 
 
 def get_reporting_year(text):
@@ -25,20 +42,23 @@ def get_reporting_year(text):
         return "0000"
 
 
-@retry(wait=wait_exponential(multiplier=60, min=20, max=320),stop=stop_after_attempt(3))
-def extract_values(context, relevant, previous = None):
-    key = open_api_key
-    client = AzureOpenAI(
-        api_key=key,
-        api_version=api_version,
-        azure_endpoint=azure_endpoint
-    )
+def count_retry(retry_state):
+    LLM_RETRIES.inc()
 
-    bin_str = '20596f752061726520612068656c7066756c206461746120656e74727920617373697374616e742e0a54686520757365722077696c6c206769766520796f752073656374696f6e73206f66206120646f63756d656e742074686174206d617920626520612068746d6c206f722074657874206578747261637465642066726f6d2061207064662e0a45787472616374207468652076616c75657320616e6420636f72726573706f6e64696e6720756e69747320666f722074686520706172616d6574657273206c69737465642062656c6f772066726f6d20746865206461746120616e642073686172652069742061732061204a534f4e20696e2074686520666f726d6174207368617265642062656c6f772e0a5468652075736572206d617920616c736f20736861726520646174612070726576696f75736c792065787472616374656420666f726d207468652066696c652e20496e207468617420636173652c2075706461746520746865204a534f4e2070726f766964656420696620616e79206d697373696e672076616c756573206172652070726573656e7420696e2069742e0a5765206f6e6c792077616e7420746865206461746120666f72207468652063757272656e74207265706f7274696e6720796561722e2049676e6f726520616c6c206f746865722076616c7565732074686174206d61792062652070726573656e740a4d616b65207375726520746f2075736520746865206578616374207370656c6c696e672c206361736520616e642073706163696e6720666f722074686520706172616d65746572206e616d6520617320696e20746865206465736372697074696f6e2062656c6f770a0a4f757470757420666f726d61743a0a7b0a202020207265706f7274696e675f796561723a0a20202020706172616d657465725f6c6973743a5b0a2020202020202020202020207b0a2020202020202020202020202020202022506172616d65746572223a737472202f2f506172616d65746572206e616d652061732073706563696669656420696e20746865206465736372697074696f6e732062656c6f770a202020202020202020202020202020202256616c7565223a6e756d657269637c4e554c4c202f2f206e756d657269632076616c7565206f662074686520676976656e20706172616d657465722c20656d707479206966206e6f2076616c756520697320676976656e0a2020202020202020202020202020202022556e697473223a7374727c4e554c4c202f2f20756e69747320666f7220746865206e756d6265722c20656d707479206966206e6f2076616c756520697320676976656e0a2020202020202020202020207d2c0a2020202020202020202020207b0a2020202020202020202020202020202022506172616d65746572223a737472202f2f506172616d65746572206e616d652061732073706563696669656420696e20746865206465736372697074696f6e732062656c6f770a202020202020202020202020202020202256616c7565223a6e756d657269637c4e554c4c202f2f206e756d657269632076616c7565206f662074686520676976656e20706172616d657465722c20656d707479206966206e6f2076616c756520697320676976656e0a2020202020202020202020202020202022556e697473223a7374727c4e554c4c202f2f20756e69747320666f7220746865206e756d6265722c20656d707479206966206e6f2076616c756520697320676976656e0a2020202020202020202020207d2c0a2020202020202020202020200a2020202020202020202020202e2e2e0a202020205d0a202020200a7d0a0a506172616d65746572206465736372697074696f6e733a0a'
 
+@retry(wait=wait_exponential(multiplier=60, min=20, max=320),stop=stop_after_attempt(3), before_sleep=count_retry)
+@timed('llm_extract')
+def extract_values(context, relevant, previous = None, use_cache = True):
     prompt = (
-        str(bytes.fromhex(bin_str).decode()) + context
+        SYSTEM_PROMPT + context
     )
+    cache_key = make_key(get_deployment(), prompt, relevant, previous)
+    if use_cache:
+        cached = llm_cache.get(cache_key)
+        if cached is not None:
+            LLM_CACHE.inc(result='hit')
+            return cached
+        LLM_CACHE.inc(result='miss')
     output = {}
     messages = [
             {"role": "system", "content": prompt},
@@ -52,13 +72,9 @@ def extract_values(context, relevant, previous = None):
         messages.append(
             {"role": "user", "content": f'Extract the parameter values from the above document in the requested format'}
         )
-    completion = client.chat.completions.create(
-        model=deployment,
-        response_format={"type": "json_object"},
-        messages=messages
-    )
+    content = get_gateway().complete(messages)
     try:
-        output = json.loads(completion.choices[0].message.content)
+        output = json.loads(content)
     except:
         pass
     if len(output)>0:
@@ -66,18 +82,19 @@ def extract_values(context, relevant, previous = None):
             if not isinstance(output['parameter_list'],list):
                 print(output)
                 raise ValueError
+        llm_cache.set(cache_key, output)
     return output
 
 
-def scope1(full_text, reporting_year, config):
-    relevant = full_text.split("(C6.1)")[1].split("<h2")[0]
+def scope1(document, reporting_year, config, use_cache=True):
+    relevant = document.section("(C6.1)", "<h2")
     
     initial = {
         'reporting_year':reporting_year,
         'parameter_list':pd.DataFrame({'Parameter':config['Parameter'], 'Value':None, 'Units':'metric tonnes CO2e'}).to_dict('records')
     }
     context = config.to_string()
-    extracted = extract_values(context, relevant, initial)
+    extracted = extract_values(context, relevant, initial, use_cache)
     temp = pd.DataFrame(extracted['parameter_list'])
     temp.insert(0,'Year',reporting_year)
     temp['Scope'] = 'Scope 1'
@@ -85,8 +102,8 @@ def scope1(full_text, reporting_year, config):
     return temp
 
 
-def scope2(full_text, reporting_year, config):
-    relevant = full_text.split("C6. Emissions")[1].split("C8.")[0]
+def scope2(document, reporting_year, config, use_cache=True):
+    relevant = document.section("C6. Emissions", "C8.")
     energy_params = [
             "Electricity Produced",
             "Electricity Purchased",
@@ -104,7 +121,7 @@ def scope2(full_text, reporting_year, config):
         'parameter_list':pd.DataFrame({'Parameter':config['Parameter'], 'Value':None, 'Units':'metric tonnes CO2e'}).to_dict('records')
     }
     context = config.to_string()
-    extracted = extract_values(context, relevant, initial)
+    extracted = extract_values(context, relevant, initial, use_cache)
     temp = pd.DataFrame(extracted['parameter_list'])
     temp.insert(0,'Year',reporting_year)
     temp['Scope'] = 'Scope 2'
@@ -112,11 +129,11 @@ def scope2(full_text, reporting_year, config):
     return temp
 
 
-def scope3(full_text, reporting_year, config):
+def scope3(document, reporting_year, config, use_cache=True):
     
     config = config.query('Parameter != "Total scope 3 emission"')    
     
-    relevant = full_text.split("(C6.5)")[1].split("<h2")[0]
+    relevant = document.section("(C6.5)", "<h2")
 
     
     initial = {
@@ -124,7 +141,7 @@ def scope3(full_text, reporting_year, config):
         'parameter_list':pd.DataFrame({'Parameter':config['Parameter'], 'Value':None, 'Units':'metric tonnes CO2e'}).to_dict('records')
     }
     context = config.to_string()
-    extracted = extract_values(context, relevant, initial)
+    extracted = extract_values(context, relevant, initial, use_cache)
     temp = pd.DataFrame(extracted['parameter_list'])
     temp.insert(0,'Year',reporting_year)
     temp['Value'] = pd.to_numeric(temp['Value'], errors = 'coerce')
@@ -143,8 +160,9 @@ def scope3(full_text, reporting_year, config):
     return temp
 
 
-def get_cdp_table_data(f, reporting_year):
-    dfs = pd.read_html(f, header=0)
+@timed('cdp_tables')
+def get_cdp_table_data(document, reporting_year):
+    dfs = document.tables()
     dlist = []
     energy_df = None
     for df in dfs:
@@ -168,17 +186,7 @@ def get_cdp_table_data(f, reporting_year):
         tot_idx = energy_df.iloc[:, 0].str.startswith("Total")
         energy_df.loc[tot_idx, "type"] = "Total"
         value_cols = ["MWh from renewable sources", "Total MWh"]
-        energy_df[value_cols] = energy_df[value_cols].applymap(
-            lambda x: (
-                float(x)
-                if (
-                    isinstance(x, float)
-                    or isinstance(x, int)
-                    or (isinstance(x, str) and x.isnumeric())
-                )
-                else np.nan
-            )
-        )
+        energy_df[value_cols] = energy_df[value_cols].apply(pd.to_numeric, errors="coerce").astype(float)
         energy_agg = energy_df.groupby("type")[value_cols].sum()
 
         elec_idx = energy_df.iloc[:, 0].str.contains("electricity", case=False)
@@ -234,201 +242,400 @@ def get_cdp_table_data(f, reporting_year):
     return dlist, temp
 
 
-def remove_header(plist, merge_pages=True):
-    page_lines = [[l for l in p.split("\n")] for p in plist]
-    header_lines = 0
-    for lines in zip(*page_lines):
-        all_lines_same = len(set(lines)) == 1
-        all_lines_page = all(
-            [re.match("^\s*\d+\s*$", chk) is not None for chk in lines]
-        )
-        if all_lines_same or all_lines_page:
-            header_lines += 1
+def pdf_pages(path):
+    """Page text of a PDF, timed and counted for the metrics endpoint"""
+    for text in timed_iter(iter_pdf_pages(path), 'pdf_text'):
+        PDF_PAGES.inc()
+        yield text
+
+
+def normalise_pages(pages, line_sep='\n', page_end='', stats=None):
+    """Clean pages as they stream past and record how much text never reaches the LLM"""
+    normaliser = PageNormaliser(line_sep, page_end)
+    try:
+        yield from normaliser.iter_pages(pages)
+    finally:
+        for name, n in normaliser.stats().items():
+            count_stat(stats, 'normalise', name, n)
+
+
+def iter_batches(pages, tlimit=50_000):
+    """Yield each token-budgeted batch of normalised pages as soon as it is full"""
+    txt = ''
+    tcount = 0
+    for p in pages:
+        if (tcount+len(p)//4) >=tlimit and len(txt) > 0:
+            yield txt
+            txt = ''
+            tcount = 0
+        txt += p
+        tcount += len(p)//4
+    if len(txt) > 0:
+        yield txt
+
+
+def prefetch(iterable, size=1):
+    """Run iterable in a background thread, keeping at most size items ready ahead of the consumer"""
+    items = queue.Queue(maxsize=size)
+    stop = threading.Event()
+    end = object()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+            put((end, None))
+        except Exception as e:
+            put((end, e))
+
+    threading.Thread(target=propagate(produce), daemon=True).start()
+    try:
+        while True:
+            item, error = items.get()
+            if item is end:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
+
+
+def map_files(func, files, concurrency=None):
+    """Run func on every file in parallel, keeping file order and isolating failures"""
+    if concurrency is None:
+        concurrency = EXTRACTION_CONCURRENCY
+    results = [None] * len(files)
+    if len(files) == 0:
+        return results
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(files)))) as executor:
+        func = propagate(func)
+        futures = {executor.submit(func, file): i for i, file in enumerate(files)}
+        for future in tqdm(as_completed(futures), total=len(futures)):
+            i = futures[future]
+            try:
+                results[i] = future.result()
+            except Exception as e:
+                print(f'Warning: Failed to extract data from {files[i]}: {e}')
+    return results
+
+
+def file_digest(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def count_stat(stats, group, name, n=1):
+    if stats is None:
+        return
+    with _stats_lock:
+        counts = stats.setdefault(group, {})
+        counts[name] = counts.get(name, 0) + n
+
+
+def extend_stat(stats, group, name, items):
+    if stats is None:
+        return
+    with _stats_lock:
+        stats.setdefault(group, {}).setdefault(name, []).extend(items)
+
+
+def cached_document(kind, path, fingerprint, extract, use_cache=True, stats=None):
+    """Reuse the stored extraction for an identical file and config, otherwise run extract and store it"""
+    DOCUMENT_BYTES.inc(os.path.getsize(path), kind=kind)
+    key = make_key(kind, file_digest(path), fingerprint, get_deployment())
+    if use_cache:
+        result = document_cache.get(key)
+        if result is not None:
+            count_stat(stats, 'document_cache', 'hits')
+            return result
+    count_stat(stats, 'document_cache', 'misses')
+    result = extract()
+    if result is not None:
+        document_cache.set(key, result)
+    return result
+
+
+def chain_extract(batches, context, use_cache=True):
+    """Extract from each batch in turn, handing the JSON extracted so far to the next call"""
+    p = None
+    data_dict = {}
+    for b in batches:
+        data_dict =  extract_values(b, context, p, use_cache)
+        if len(data_dict) >0:
+            p = json.dumps(data_dict, indent = 1)
         else:
-            break
-    modified_pages = ["\n".join(p[header_lines:]) for p in page_lines]
-    if merge_pages:
-        all_text = "\n".join(modified_pages)
-        return all_text
-    else:
-        return modified_pages
-
-
-def remove_footer(plist, merge_pages=True):
-    page_lines = [[l for l in p.split("\n")] for p in plist]
-    modified_pages = []
-    for i, p in enumerate(page_lines):
-        footer_start = len(p)
-        for l in p[::-1]:
-            m = re.match("^\s*\d+\s*$", l)
-            is_page_no = (m is not None) and (int(l) == (i + 1))
-            is_blank = re.match("^\s*$", l) is not None
-            if is_page_no or is_blank:
-                footer_start -= 1
-            else:
-                break
-        modified_pages.append("\n".join(p[:footer_start]))
-    if merge_pages:
-        all_text = "\n".join(modified_pages)
-        return all_text
-    else:
-        return modified_pages
+            p = None
+    return data_dict
+
+
+def is_missing(value):
+    if value is None:
+        return True
+    if isinstance(value, float) and np.isnan(value):
+        return True
+    return isinstance(value, str) and value.strip().upper() in ('', 'NULL', 'NONE', 'N/A', 'NAN')
+
+
+def reduce_extractions(results):
+    """Merge per-batch extractions: the first non-null value per parameter wins, disagreements are flagged"""
+    merged = {}
+    sources = {}
+    conflicts = []
+    years = []
+    for batch, result in enumerate(results):
+        if not is_missing(result.get('reporting_year')):
+            years.append(result['reporting_year'])
+        for item in result.get('parameter_list', []):
+            name = item.get('Parameter')
+            if name not in merged:
+                merged[name] = dict(item)
+                sources[name] = batch
+                continue
+            kept = merged[name]
+            if is_missing(kept.get('Value')):
+                if not is_missing(item.get('Value')):
+                    merged[name] = dict(item)
+                    sources[name] = batch
+            elif not is_missing(item.get('Value')) and (
+                item.get('Value') != kept.get('Value') or item.get('Units') != kept.get('Units')
+            ):
+                conflicts.append({
+                    'Parameter': name,
+                    'Value': kept.get('Value'),
+                    'Units': kept.get('Units'),
+                    'batch': sources[name],
+                    'other_value': item.get('Value'),
+                    'other_units': item.get('Units'),
+                    'other_batch': batch,
+                })
+    if len(merged) == 0 and len(years) == 0:
+        return {}
+    return {
+        'reporting_year': max(set(years), key=years.count) if len(years) > 0 else None,
+        'parameter_list': list(merged.values()),
+        'conflicts': conflicts,
+    }
 
 
-def process_annual_report(folder, config_file):
-    config_annual = pd.read_excel(config_file, sheet_name="annual_reports")
-    context = config_annual.to_string(index = False)
-    files = os.listdir(folder)
+def map_reduce_extract(batches, context, use_cache=True, stats=None):
+    """Send every batch without previous JSON as soon as it is ready, then merge the results locally"""
+    with ThreadPoolExecutor(max_workers=max(1, MAP_REDUCE_CONCURRENCY)) as executor:
+        extract = propagate(extract_values)
+        futures = [executor.submit(extract, b, context, None, use_cache) for b in batches]
+        results = [future.result() for future in futures]
+    data_dict = reduce_extractions(results)
+    conflicts = data_dict.get('conflicts', [])
+    count_stat(stats, 'map_reduce', 'batches', len(results))
+    count_stat(stats, 'map_reduce', 'conflicts', len(conflicts))
+    extend_stat(stats, 'map_reduce', 'conflicting_parameters', conflicts)
+    for c in conflicts:
+        logger.warning(
+            f"Conflicting values for {c['Parameter']}: "
+            f"{c['Value']} {c['Units']} (batch {c['batch']}) kept over {c['other_value']} {c['other_units']} (batch {c['other_batch']})"
+        )
+    return data_dict
 
-    dlist = []
-    for file in tqdm(files):
-        
-        with pdfplumber.open(os.path.join(folder, file)) as pdf:
-            # Read pages
-            pdf_text = [p.extract_text(layout=True) for p in pdf.pages]
-            
-        # Batch pages
-        batches= []
-        txt = ''
-        tcount = 0
-        tlimit = 50_000
-        for p in pdf_text:
-            #Preprocess page
-            lines = p.split('\n')
-            lines = [x.rstrip() for x in lines]
-            # if len(lines) <1:
-            #     continue
-            margins = [len(x)-len(x.strip()) for x in lines if x!='']
-            if len(margins)>0:
-                margin = min(margins)
-                patt ='^'+ ' '*margin
-                lines = [re.sub(patt,'', x) for x in lines]
-            p = '\n\n'.join(lines).strip()
-            
-            if (tcount+len(p)//4) >=tlimit:
-                batches.append(txt)
-                txt = ''
-                tcount = 0
-            txt += p
-            tcount += len(p)//4
-        if len(txt) > 0:
-            batches.append(txt)
-    
-        #  Extract data
-        p = None
-        for b in batches:
-            data_dict =  extract_values(b, context, p)
-            if len(data_dict) >0:
-                p = json.dumps(data_dict, indent = 1)
-            else:
-                p = None
+
+def extract_batches(batches, context, use_cache=True, stats=None):
+    if EXTRACTION_MODE == 'map_reduce':
+        return map_reduce_extract(batches, context, use_cache, stats)
+    return chain_extract(batches, context, use_cache)
+
+
+def extract_cdp_pdf(path, config, use_cache=True, stats=None):
+    """Extract a CDP PDF, sending each scope's parameters only with the pages holding its questions.
+
+    The question index is built as pages stream past and the page text is spooled to disk, so memory
+    stays flat; scopes are only known once the last page is indexed, so extraction starts after that.
+    """
+    index = QuestionIndex()
+    with PageSpool() as spool:
+        for text in normalise_pages(pdf_pages(path), line_sep='\n', page_end='\n', stats=stats):
+            index.add_page(text)
+            spool.append(text)
+
+        scope_pages = index.scope_pages(list(config['Scope'].unique()))
+        groups = [
+            (config[config['Scope'] == scope], pages_idx)
+            for scope, pages_idx in scope_pages.items() if pages_idx is not None
+        ]
+        # Scopes whose questions were not found go together against the whole document
+        unindexed = [scope for scope, pages_idx in scope_pages.items() if pages_idx is None]
+        if len(unindexed) > 0:
+            groups.append((config[config['Scope'].isin(unindexed)], list(range(len(spool)))))
+        count_stat(stats, 'question_index', 'pages_total', len(spool))
+        count_stat(stats, 'question_index', 'pages_sent', sum(len(idx) for _, idx in groups))
+
+        def extract_group(group):
+            group_config, pages_idx = group
+            batches = iter_batches(spool.pages(pages_idx))
+            return extract_batches(batches, group_config.to_string(), use_cache, stats)
+
+        if len(groups) == 0:
+            return {}
+        with ThreadPoolExecutor(max_workers=max(1, min(len(groups), EXTRACTION_CONCURRENCY))) as executor:
+            results = list(executor.map(propagate(extract_group), groups))
+
+    data_dict = {}
+    for result in results:
+        if 'parameter_list' not in result:
+            continue
+        if 'parameter_list' not in data_dict:
+            data_dict = {'reporting_year': result.get('reporting_year'), 'parameter_list': []}
+        if data_dict['reporting_year'] is None:
+            data_dict['reporting_year'] = result.get('reporting_year')
+        data_dict['parameter_list'] = data_dict['parameter_list'] + result['parameter_list']
+    return data_dict
+
+
+def extract_annual_report_file(folder, file, context, queries=None, use_cache=True, stats=None):
+    # Stream pages into batches so extraction starts before the whole file is parsed
+    pages = normalise_pages(pdf_pages(os.path.join(folder, file)), line_sep='\n\n', stats=stats)
+    if not queries:
+        return annual_report_frame(file, extract_batches(prefetch(iter_batches(pages)), context, use_cache, stats))
+
+    # Scoring needs every page, so pages are scored and spooled to disk as they arrive and only the
+    # selected ones are read back; memory stays flat, but no batch goes out before the last page is read
+    index = PageIndex(query_terms(queries))
+    with PageSpool() as spool:
+        for text in pages:
+            index.add_page(text)
+            spool.append(text)
+        with span('relevance'):
+            keep = index.select(queries)
+        count_stat(stats, 'relevance', 'pages_total', len(spool))
+        count_stat(stats, 'relevance', 'pages_sent', len(keep))
+        batches = prefetch(iter_batches(spool.pages(keep)))
+        return annual_report_frame(file, extract_batches(batches, context, use_cache, stats))
+
+
+def annual_report_frame(file, data_dict):
+    if 'parameter_list' in data_dict:
+        frame = pd.DataFrame(data_dict['parameter_list'])
+        frame.insert(0, 'Year',data_dict['reporting_year'])
+        return frame
+
+    print(f'Warning: No data extracted from {file}')
+    return None
+
+
+def process_annual_report(folder, config_file, concurrency=None, use_cache=True, stats=None):
+    workbook = load_config(config_file)
+    config_annual = workbook.annual_parameters
+    context = workbook.annual_context
+    queries = parameter_queries(config_annual) if RELEVANCE_PAGES_PER_PARAMETER > 0 else None
+    fingerprint = make_key(
+        config_annual.to_csv(index=False), RELEVANCE_PAGES_PER_PARAMETER, RELEVANCE_NEIGHBOURS, EXTRACTION_MODE,
+        BOILERPLATE_MIN_PAGES
+    )
+    files = sorted(os.listdir(folder))
+
+    def process_file(file):
+        return cached_document(
+            'annual_report', os.path.join(folder, file), fingerprint,
+            lambda: extract_annual_report_file(folder, file, context, queries, use_cache, stats),
+            use_cache, stats
+        )
+
+    frames = map_files(process_file, files, concurrency)
+    dlist = [frame for frame in frames if frame is not None]
+
+    report = pd.concat(dlist, ignore_index = True)
+    return report
+
+
+def extract_cdp_report_file(folder, file, config, config1, config2, config3, use_cache=True, stats=None):
+    """Return the report frames for one CDP file and, for HTML exports, the raw tables found in it"""
+    file_path = os.path.join(folder, file)
+    if file_path.endswith('html'):
+        with open(file_path, "r") as f:
+            full_text = f.read()
+        # One scan indexes the sections every scope slices from; tables are parsed from the same text
+        document = CDPHtmlIndex(full_text)
+        reporting_year = document.reporting_year()
+        # The scope extractions are independent LLM calls, so run them alongside the table parsing
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            fut1 = executor.submit(propagate(scope1), document, reporting_year, config1, use_cache)
+            fut2 = executor.submit(propagate(scope2), document, reporting_year, config2, use_cache)
+            fut3 = executor.submit(propagate(get_cdp_table_data), document, reporting_year)
+            fut4 = executor.submit(propagate(scope3), document, reporting_year, config3, use_cache)
+            temp1 = fut1.result()
+            temp2 = fut2.result()
+            dfs, temp3 = fut3.result()
+            temp4 = fut4.result()
+        return [temp1, temp2, temp3, temp4], dfs
+
+    elif file_path.endswith('pdf'):
+        data_dict = extract_cdp_pdf(file_path, config, use_cache, stats)
 
         if 'parameter_list' in data_dict:
-            frame = pd.DataFrame(data_dict['parameter_list'])
+            frame = pd.DataFrame(data_dict['parameter_list']).rename(columns = {'Units':'Unit'})
+            frame['Value'] = pd.to_numeric(frame['Value'], errors = 'coerce')
+            frame = config[['Scope','Parameter']].merge(frame, on = 'Parameter', how = 'left')
             frame.insert(0, 'Year',data_dict['reporting_year'])
-            dlist.append(frame)
-
+            tot_idx = frame['Parameter'] == 'Total scope 3 emission'
+            frame = frame.drop(tot_idx[tot_idx].index)
+            scope_3_idx = (frame['Scope'] == 'Scope 3')
+            tot_scope_3 = frame.loc[scope_3_idx,'Value'].sum()
+            tot_row = pd.DataFrame(
+                {
+                    'Year':data_dict['reporting_year'],
+                    'Scope': 'Scope 3',
+                    'Parameter':'Total scope 3 emission',
+                    'Value': tot_scope_3,
+                    'Units': 'metric tonnes CO2e'
+                },
+                index = [0]
+            )
+            return [frame, tot_row], []
         else:
             print(f'Warning: No data extracted from {file}')
-    
-    report = pd.concat(dlist, ignore_index = True)
-    return report
+            return None
 
+    print('File Format not recognised')
+    return None
 
-def process_cdp_report(folder, output, config_file):
-    files = os.listdir(folder)
-    config = pd.read_excel(config_file, sheet_name='climate_reports')
-    config3 = config[config["Scope"] == "Scope 3"]
-    config2 = config[config["Scope"] == "Scope 2"]
-    config1 = config[config["Scope"] == "Scope 1"]
-    report = pd.DataFrame()
+
+def process_cdp_report(folder, output, config_file, concurrency=None, use_cache=True, stats=None):
+    files = sorted(os.listdir(folder))
+    workbook = load_config(config_file)
+    config = workbook.climate_parameters
+    config1, config2, config3 = (workbook.scope_parameters[scope] for scope in ('Scope 1', 'Scope 2', 'Scope 3'))
+    fingerprint = make_key(config.to_csv(index=False), EXTRACTION_MODE, BOILERPLATE_MIN_PAGES)
     print("processing cdp reports")
-    for file in tqdm(files):
-        config = pd.read_excel(config_file)
-        file_path = os.path.join(folder, file)
-        if file_path.endswith('html'):
-            with open(file_path, "r") as f:
-                full_text = f.read()
-                reporting_year = get_reporting_year(full_text)
-                temp1 = scope1(full_text, reporting_year, config1)
-                temp2 = scope2(full_text, reporting_year, config2)
-                dfs, temp3 = get_cdp_table_data(file_path, reporting_year)
-                temp4 = scope3(full_text, reporting_year, config3)
-            with pd.ExcelWriter(os.path.join(output, file + ".xlsx"), mode="w") as excel:
+
+    def process_file(file):
+        result = cached_document(
+            'cdp_report', os.path.join(folder, file), fingerprint,
+            lambda: extract_cdp_report_file(folder, file, config, config1, config2, config3, use_cache, stats),
+            use_cache, stats
+        )
+        if result is None:
+            return None
+        file_frames, dfs = result
+        if len(dfs) > 0:
+            with span('excel_write'), pd.ExcelWriter(os.path.join(output, file + ".xlsx"), mode="w") as excel:
                 for i in range(len(dfs)):
                     dfs[i].to_excel(excel, sheet_name=str(i))
-            report = pd.concat([report, temp1, temp2, temp3, temp4], ignore_index = True)
-        
-        elif file_path.endswith('pdf'):
-            context = config.to_string()
-            scope_map = pd.Series(config['Scope'], index = config['Parameter'])
-            with pdfplumber.open(os.path.join(folder, file)) as pdf:
-                # Read pages
-                pdf_text = [p.extract_text(layout=True) for p in pdf.pages]
-                
-                # Batch pages
-                batches= []
-                txt = ''
-                tcount = 0
-                tlimit = 50_000
-                for p in pdf_text:
-                    #Preprocess page
-                    lines = p.split('\n')
-                    lines = [x.rstrip() for x in lines]
-                    # if len(lines) <1:
-                    #     continue
-                    margins = [len(x)-len(x.strip()) for x in lines if x!='']
-                    if len(margins)>0:
-                        margin = min(margins)
-                        patt ='^'+ ' '*margin
-                        lines = [re.sub(patt,'', x) for x in lines]
-                    p = '\n'.join(lines).strip() +'\n'
-                    
-                    if (tcount+len(p)//4) >=tlimit:
-                        batches.append(txt)
-                        txt = ''
-                        tcount = 0
-                    txt += p
-                    tcount += len(p)//4
-                if len(txt) > 0:
-                    batches.append(txt)
-            
-                #  Extract data
-                p = None
-                for b in batches:
-                    data_dict =  extract_values(b, context, p)
-                    if len(data_dict) >0:
-                        p = json.dumps(data_dict, indent = 1)
-                    else:
-                        p = None
-
-                if 'parameter_list' in data_dict:
-                    frame = pd.DataFrame(data_dict['parameter_list']).rename(columns = {'Units':'Unit'})
-                    frame['Value'] = pd.to_numeric(frame['Value'], errors = 'coerce')
-                    frame = config[['Scope','Parameter']].merge(frame, on = 'Parameter', how = 'left')
-                    frame.insert(0, 'Year',data_dict['reporting_year'])
-                    tot_idx = frame['Parameter'] == 'Total scope 3 emission'
-                    frame = frame.drop(tot_idx[tot_idx].index)
-                    scope_3_idx = (frame['Scope'] == 'Scope 3')
-                    tot_scope_3 = frame.loc[scope_3_idx,'Value'].sum()
-                    tot_row = pd.DataFrame(
-                        {
-                            'Year':data_dict['reporting_year'],
-                            'Scope': 'Scope 3',
-                            'Parameter':'Total scope 3 emission',
-                            'Value': tot_scope_3,
-                            'Units': 'metric tonnes CO2e'
-                        },
-                        index = [0]
-                    )
-                    
-                    report = pd.concat([report, frame, tot_row], ignore_index = True)
-                else:
-                    print(f'Warning: No data extracted from {file}')
+        return file_frames
+
+    frames = map_files(process_file, files, concurrency)
+    report = pd.concat([pd.DataFrame()] + [f for file_frames in frames if file_frames for f in file_frames], ignore_index = True)
 
-        else:
-            print('File Format not recognised')
-        
     report["Activity"] = ["Total" for i in range(len(report))]
     report = report[["Year", "Scope", "Parameter", "Activity", "Value", "Unit"]]
 
@@ -2,67 +2,53 @@ from pathlib import Path
 
 import pandas as pd
 import numpy as np
-from sklearn.linear_model import LinearRegression
-from sklearn.metrics import r2_score
 import re
 
+from cells.base.metrics import timed
+from .wls import fit_candidates, predict_candidates
+from .ccf_models import fit_series
 
-def get_ongil_ccf_estimates(df, predictors, pred_mat):
-    predictors = predictors.set_index('Year')
+
+@timed('ccf_estimates')
+def get_ongil_ccf_estimates(df, predictors, pred_mat, models=None, scenario=None):
+    """Company reported and Ongil estimated values with confidence, per year and series.
+
+    models, when given, holds the fitted series of an earlier estimate: only series whose inputs changed
+    are refitted, and it is updated in place. scenario is a copy of predictors with what-if values; the
+    series are still fitted on predictors, and predicted from the scenario.
+    """
     wide_df = df.pivot(index = 'Year', columns = ['Scope','Parameter','Activity','Units'],values='Value')
     energy_pred1 = df.query('(Scope == "Scope 2") & (Activity == "Total") & (Parameter == "Energy Use Total")').set_index('Year')['Value'].rename('energy_use')
     ren_energy_pred1 = df.query('(Scope == "Scope 2") & (Activity == "Total") & (Parameter == "Total Renewable Energy")').set_index('Year')['Value'].rename('energy_use')
     energy_pred = energy_pred1 - ren_energy_pred1
-    predictors = predictors.join(energy_pred)
-    predictors = predictors.loc[wide_df.index]
-    param_predictors = pred_mat.apply(lambda x: x[x].index.tolist(), axis = 1).to_dict()
+    predictors = predictors.set_index('Year').join(energy_pred).loc[wide_df.index]
+    if scenario is not None:
+        scenario = scenario.set_index('Year').join(energy_pred).loc[wide_df.index]
+    param_predictors = {k: pred_mat.columns[row].tolist() for k, row in zip(pred_mat.index, pred_mat.to_numpy(dtype = bool))}
     s2_params = [x for x,y in param_predictors.items() if 'based' in x[1].lower() ]
     for p in s2_params:
         param_predictors[p].append('energy_use')
     n = len(predictors.index)
-    weights = pd.Series([1.2**j for j in range(n)],index = predictors.index, name = 'weights')
-    lmod = LinearRegression(fit_intercept = False)
-    pred_df = pd.DataFrame(index = wide_df.index, columns = wide_df.columns)
-    k = 0
+    weights = np.array([1.2**j for j in range(n)])
+    # Every (series, candidate predictor) pair is fitted at once; see wls.fit_candidates
+    candidates = []
     for scope, param, act, units in wide_df.columns:
-        k = k+1
         pred_cols = param_predictors[(scope, param, act)]
-        if (pred_cols is None) or (isinstance(pred_cols, list) and (len(pred_cols) == 0)):
-            continue
-        y = f'{scope}_{param}_{act}'
-        col = (scope, param, act, units)
-        ydata = wide_df[col].rename(y).copy().replace({0:np.nan})
-        max_score = - np.inf
-        for i,x in enumerate(pred_cols):
-
-            plot_data = predictors[[x]].join(ydata).join(weights)
-
-            if all(ydata.isnull()):
-                continue
-
-            tridx = plot_data[x].notnull() & plot_data[y].notnull()
-            if tridx.sum()<3:
-                continue
-            X = plot_data.loc[tridx,[x]]
-            Y = plot_data.loc[tridx,y]
-            w = plot_data.loc[tridx,'weights']
-            lmod.fit(X,Y, sample_weight = w)
-
-            pred_idx = plot_data[x].notnull()
-
-            y_pred = lmod.predict(plot_data.loc[pred_idx,[x]])
-            plot_data.loc[pred_idx,'ypred'] = y_pred
-            score = r2_score(Y, plot_data.loc[tridx,'ypred'])
-            if score >= max_score:
-                x_best = x
-                max_score = score
-                num_idx= pred_idx[pred_idx].index
-                pred_df.loc[num_idx,col] = y_pred
-
-            for j in range(len(plot_data)):
-                xj, yj = plot_data.iloc[j,:][[x,y]]
-                if any(np.isnan([xj,yj])):
-                    continue
+        candidates.append([] if pred_cols is None else list(pred_cols))
+    names = list(dict.fromkeys(x for pred_cols in candidates for x in pred_cols))
+    position = {x: i for i, x in enumerate(names)}
+    xdata = predictors[names].to_numpy(dtype=float).T
+    ydata = wide_df.to_numpy(dtype=float, copy=True).T
+    ydata[ydata == 0] = np.nan
+    candidate_rows = [[position[x] for x in c] for c in candidates]
+    if models is None:
+        slopes, scores = fit_candidates(xdata, ydata, weights, candidate_rows)
+    else:
+        slopes, scores, _ = fit_series(xdata, ydata, weights, names, candidate_rows, list(wide_df.columns), models)
+    if scenario is not None:
+        xdata = scenario[names].to_numpy(dtype=float).T
+    preds = predict_candidates(xdata, candidate_rows, slopes, scores)
+    pred_df = pd.DataFrame(preds.T, index = wide_df.index, columns = wide_df.columns)
     ongil_score = wide_df.transpose()
     ongil_score.columns  = pd.MultiIndex.from_product([ongil_score.columns, ['Company Reported']])
     ongil_pred = pred_df.transpose().astype(float).round()
@@ -131,8 +117,11 @@ def get_ongil_ccf_estimates(df, predictors, pred_mat):
             ongil_pred.loc[subtot.index] = subtot
     er_df = pred_df - wide_df
     rel_er_df = (er_df.abs())/ (wide_df.abs()+1000)
-    conf_wide = pd.cut(rel_er_df.stack(['Scope','Parameter','Activity','Units']), [0,0.2,0.4,np.inf], labels = ['High','Medium','Low']).unstack(['Scope','Parameter','Activity','Units'])
-    conf = conf_wide.transpose().astype(str).replace({'nan':'Not Applicable'})
+    # Bands of [0, 0.2], (0.2, 0.4] and above; only years and series with an error at all get a Confidence
+    rel_er = rel_er_df.to_numpy()
+    band = np.select([rel_er > 0.4, rel_er > 0.2, rel_er >= 0], ['Low', 'Medium', 'High'], 'Not Applicable').astype(object)
+    has_error = ~np.isnan(rel_er)
+    conf = pd.DataFrame(band, index = rel_er_df.index, columns = rel_er_df.columns).loc[has_error.any(axis = 1), has_error.any(axis = 0)].transpose()
     conf.columns = pd.MultiIndex.from_product([conf.columns, ['Confidence']])
     combined = ongil_score.round().join(ongil_pred).fillna(0).join(conf).sort_index().sort_index(axis = 1, level = 0)
     combined.columns.names = ['Year','Value']
@@ -245,6 +234,7 @@ def generate_prompt(i, row, param_descriptions, descriptions):
     return uinput
 
 
+@timed('explainability')
 def generate_explainability_text(dep_matrix, predictor_config, param_config, company):
     param_descriptions = predictor_config.set_index('Parameter')['Description'].to_dict()
     descriptions = param_config.set_index('Parameter')['Description'].to_dict()
@@ -265,3 +255,50 @@ def generate_explainability_text(dep_matrix, predictor_config, param_config, com
         exp1[i] = uinput
 
     return exp1
+
+
+def read_estimator_inputs(cdp_report_path, annual_report_path):
+    """The extracted CDP values and yearly predictors of one company, ready for get_ongil_ccf_estimates"""
+    df = pd.read_excel(cdp_report_path).rename(columns={"Unit": 'Units'})
+    if 'Activity' not in df.columns:
+        df['Activity'] = 'Total'
+    df['Year'] = df['Year'].astype(int)
+    df.loc[df['Units'] != 'MWh','Units'] = 'metric tonnes CO2e'
+
+    predictors_long = pd.read_excel(annual_report_path).rename(columns={"Unit": 'Units'})
+    predictors = predictors_long.set_index(['Year', 'Parameter'])['Value'].unstack('Parameter').reset_index()
+    return df, predictors
+
+
+def what_if_predictors(predictors, overrides):
+    """Copy of predictors with {predictor: {year: value}} overrides applied, for a what-if estimate"""
+    scenario = predictors.copy()
+    for name, values in overrides.items():
+        if name not in scenario.columns or name == 'Year':
+            raise ValueError(f"Unknown predictor {name!r}")
+        for year, value in values.items():
+            rows = scenario['Year'] == int(year)
+            if not rows.any():
+                raise ValueError(f"No {year} in the annual report predictors")
+            scenario.loc[rows, name] = value
+    return scenario
+
+
+def dependency_matrix(df, parameter_matrix):
+    """Which predictors each reported (Scope, Parameter, Activity) is regressed on"""
+    return (
+        df[['Scope', 'Parameter', 'Activity']]
+        .drop_duplicates()
+        .merge(parameter_matrix, on=['Scope', 'Parameter'])
+        .set_index(['Scope', 'Parameter', 'Activity'])
+        .astype(bool)
+    )
+
+
+def estimate_company(df, predictors, config_dict, company, models=None, scenario=None):
+    """Estimates, dependency matrix and explainability text for one company, from the parsed config workbook"""
+    pred_mat = dependency_matrix(df, config_dict['Dependency Matrix'])
+    estimates = get_ongil_ccf_estimates(df, predictors, pred_mat, models, scenario)
+    estimates['Ongil Estimated'] = estimates['Ongil Estimated'].fillna(0)
+    chk = generate_explainability_text(pred_mat, config_dict['annual_reports'], config_dict['climate_reports'], company)
+    return estimates, pred_mat, chk
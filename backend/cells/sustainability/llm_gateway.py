@@ -0,0 +1,172 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+from decouple import config
+
+from config.settings import LLM_FIXTURE_DIR, LLM_MAX_IN_FLIGHT, LLM_MAX_CONNECTIONS, LLM_TIMEOUT
+from config.settings import LLM_TRANSPORT, LLM_LOCAL_URL, LLM_REPLAY_LATENCY
+from ..base.metrics import LLM_REQUESTS, LLM_SECONDS, LLM_TOKENS
+from ..base.metrics import LLM_IN_FLIGHT, LLM_WAITING, LLM_LATENCY, LLM_CONNECTIONS
+from .llm_transport import make_transport
+
+logger = logging.getLogger(__name__)
+
+bin_str = '20596f752061726520612068656c7066756c206461746120656e74727920617373697374616e742e0a54686520757365722077696c6c206769766520796f752073656374696f6e73206f66206120646f63756d656e742074686174206d617920626520612068746d6c206f722074657874206578747261637465642066726f6d2061207064662e0a45787472616374207468652076616c75657320616e6420636f72726573706f6e64696e6720756e69747320666f722074686520706172616d6574657273206c69737465642062656c6f772066726f6d20746865206461746120616e642073686172652069742061732061204a534f4e20696e2074686520666f726d6174207368617265642062656c6f772e0a5468652075736572206d617920616c736f20736861726520646174612070726576696f75736c792065787472616374656420666f726d207468652066696c652e20496e207468617420636173652c2075706461746520746865204a534f4e2070726f766964656420696620616e79206d697373696e672076616c756573206172652070726573656e7420696e2069742e0a5765206f6e6c792077616e7420746865206461746120666f72207468652063757272656e74207265706f7274696e6720796561722e2049676e6f726520616c6c206f746865722076616c7565732074686174206d61792062652070726573656e740a4d616b65207375726520746f2075736520746865206578616374207370656c6c696e672c206361736520616e642073706163696e6720666f722074686520706172616d65746572206e616d6520617320696e20746865206465736372697074696f6e2062656c6f770a0a4f757470757420666f726d61743a0a7b0a202020207265706f7274696e675f796561723a0a20202020706172616d657465725f6c6973743a5b0a2020202020202020202020207b0a2020202020202020202020202020202022506172616d65746572223a737472202f2f506172616d65746572206e616d652061732073706563696669656420696e20746865206465736372697074696f6e732062656c6f770a202020202020202020202020202020202256616c7565223a6e756d657269637c4e554c4c202f2f206e756d657269632076616c7565206f662074686520676976656e20706172616d657465722c20656d707479206966206e6f2076616c756520697320676976656e0a2020202020202020202020202020202022556e697473223a7374727c4e554c4c202f2f20756e69747320666f7220746865206e756d6265722c20656d707479206966206e6f2076616c756520697320676976656e0a2020202020202020202020207d2c0a2020202020202020202020207b0a2020202020202020202020202020202022506172616d65746572223a737472202f2f506172616d65746572206e616d652061732073706563696669656420696e20746865206465736372697074696f6e732062656c6f770a202020202020202020202020202020202256616c7565223a6e756d657269637c4e554c4c202f2f206e756d657269632076616c7565206f662074686520676976656e20706172616d657465722c20656d707479206966206e6f2076616c756520697320676976656e0a2020202020202020202020202020202022556e697473223a7374727c4e554c4c202f2f20756e69747320666f7220746865206e756d6265722c20656d707479206966206e6f2076616c756520697320676976656e0a2020202020202020202020207d2c0a2020202020202020202020200a2020202020202020202020202e2e2e0a202020205d0a202020200a7d0a0a506172616d65746572206465736372697074696f6e733a0a'
+
+# Decoded once at import instead of on every extraction call
+SYSTEM_PROMPT = bytes.fromhex(bin_str).decode()
+
+
+def get_deployment():
+    """Model deployment for requests and cache keys; the offline transports run without one configured"""
+    if LLM_TRANSPORT in ('replay', 'local'):
+        return config("DEPLOYMENT", default=LLM_TRANSPORT)
+    return config("DEPLOYMENT")
+
+
+def request_key(model, messages):
+    payload = json.dumps({'model': model, 'messages': messages}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def latency_summary(latencies):
+    latencies = np.array(latencies)
+    return {
+        'count': len(latencies),
+        'mean': float(latencies.mean()) if len(latencies) else None,
+        'p50': float(np.percentile(latencies, 50)) if len(latencies) else None,
+        'p95': float(np.percentile(latencies, 95)) if len(latencies) else None,
+        'max': float(latencies.max()) if len(latencies) else None,
+    }
+
+
+class LLMGateway:
+    """Shared chat-completions client with keep-alive connections and in-flight request coalescing.
+
+    Requests in flight, waiting requests, connections in use and recent latency are published as gauges
+    on /api/metrics/. Each call holds one pooled connection while it runs, so connections in use are
+    counted here, up to the pool's limit, rather than read from the HTTP client.
+    """
+
+    def __init__(self, max_in_flight=LLM_MAX_IN_FLIGHT, max_connections=LLM_MAX_CONNECTIONS, timeout=LLM_TIMEOUT,
+                 transport=None):
+        self.max_in_flight = max_in_flight
+        if transport is None:
+            transport = make_transport(
+                LLM_TRANSPORT, max_connections, timeout, LLM_FIXTURE_DIR, LLM_LOCAL_URL, LLM_REPLAY_LATENCY
+            )
+        self.transport = transport
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=1000)
+        self._counts = {'calls': 0, 'errors': 0, 'coalesced': 0, 'prompt_tokens': 0, 'completion_tokens': 0}
+        self._active = 0
+        self._peak_active = 0
+        self.max_connections = transport.pool_stats()['max_connections']
+        LLM_CONNECTIONS.set(self.max_connections, state='max')
+        self._publish()
+
+    def _publish(self):
+        """Update the gauges; called with the lock held, or before the gateway is shared"""
+        LLM_IN_FLIGHT.set(self._active)
+        LLM_WAITING.set(len(self._inflight) - self._active)
+        LLM_CONNECTIONS.set(min(self._active, self.max_connections), state='in_use')
+        LLM_CONNECTIONS.set(min(self._peak_active, self.max_connections), state='peak_in_use')
+
+    def complete(self, messages):
+        """Return the message content for a JSON chat completion, sharing identical concurrent requests"""
+        key = request_key(get_deployment(), messages)
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+                self._publish()
+            else:
+                self._counts['coalesced'] += 1
+        if not leader:
+            return future.result()
+
+        try:
+            content = self._call(messages)
+            future.set_result(content)
+            return content
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+                self._publish()
+
+    def _call(self, messages):
+        with self._slots:
+            with self._lock:
+                self._active += 1
+                self._peak_active = max(self._peak_active, self._active)
+                self._publish()
+            start = time.perf_counter()
+            try:
+                result = self.transport.chat(get_deployment(), messages)
+            except Exception:
+                with self._lock:
+                    self._counts['errors'] += 1
+                LLM_REQUESTS.inc(status='error')
+                raise
+            finally:
+                latency = time.perf_counter() - start
+                LLM_SECONDS.observe(latency)
+                with self._lock:
+                    self._active -= 1
+                    self._counts['calls'] += 1
+                    self._latencies.append(latency)
+                    self._publish()
+                    recent = latency_summary(self._latencies)
+                for stat in ('mean', 'p50', 'p95', 'max'):
+                    LLM_LATENCY.set(recent[stat], stat=stat)
+        LLM_REQUESTS.inc(status='ok')
+        with self._lock:
+            self._counts['prompt_tokens'] += result['prompt_tokens'] or 0
+            self._counts['completion_tokens'] += result['completion_tokens'] or 0
+        LLM_TOKENS.inc(result['prompt_tokens'] or 0, kind='prompt')
+        LLM_TOKENS.inc(result['completion_tokens'] or 0, kind='completion')
+        logger.info(f"LLM call completed in {latency:.2f}s")
+        return result['content']
+
+    def stats(self):
+        with self._lock:
+            latencies = list(self._latencies)
+            stats = dict(self._counts)
+            stats['in_flight'] = self._active
+            stats['waiting'] = len(self._inflight) - self._active
+            peak = self._peak_active
+        stats['max_in_flight'] = self.max_in_flight
+        stats['latency'] = latency_summary(latencies)
+        stats['transport'] = LLM_TRANSPORT
+        stats['pool'] = dict(
+            self.transport.pool_stats(),
+            in_use=min(stats['in_flight'], self.max_connections),
+            peak_in_use=min(peak, self.max_connections)
+        )
+        return stats
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway():
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = LLMGateway()
+    return _gateway
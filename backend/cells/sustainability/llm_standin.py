@@ -0,0 +1,234 @@
+"""Local stand-in for the Azure OpenAI chat-completions endpoint, for load and performance testing offline.
+
+    python -m cells.sustainability.llm_standin --port 8765 --latency 2 --jitter 1 --rate-limit 0.05
+
+then run the backend with LLM_TRANSPORT=local (and LLM_LOCAL_URL if the port differs). Answers are
+deterministic JSON extractions: values still missing from the JSON the pipeline sends are filled in
+from a hash of the parameter name. GET /stats returns the request counts seen so far.
+"""
+import argparse
+import ast
+import json
+import logging
+import random
+import re
+import threading
+import time
+import uuid
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+PREVIOUS_RE = re.compile(r"Update the JSON with the values from the above document:(.*)", re.S)
+YEAR_RE = re.compile(r"\b(20\d\d)\b")
+
+
+def parse_previous(text):
+    """The JSON the pipeline asks to update; extract_values formats it as a Python literal"""
+    match = PREVIOUS_RE.search(text)
+    if match is None:
+        return None
+    try:
+        return ast.literal_eval(match.group(1).strip())
+    except (ValueError, SyntaxError):
+        try:
+            return json.loads(match.group(1))
+        except ValueError:
+            return None
+
+
+def prompt_parameters(text):
+    """Parameter names from a config table (DataFrame.to_string), after the prompt's heading if it has one"""
+    lines = [line for line in text.split('Parameter descriptions:')[-1].splitlines() if line.strip()]
+    if not lines:
+        return []
+    match = re.search(r"\bParameter\b", lines[0])
+    if match is None:
+        return []
+    # Columns are right-aligned, so this one spans from the end of the previous header to the end of its own
+    start = len(lines[0][:match.start()].rstrip())
+    return [line[start:match.end()].strip() for line in lines[1:] if line[start:match.end()].strip()]
+
+
+def document_year(messages):
+    """First year near the start of the user messages, then of the context that follows the system prompt"""
+    texts = [m.get('content') or '' for m in messages if m.get('role') == 'user']
+    texts += [(m.get('content') or '').split('Parameter descriptions:')[-1] for m in messages if m.get('role') == 'system']
+    for text in texts:
+        years = YEAR_RE.findall(text[:5000])
+        if years:
+            return int(years[0])
+    return None
+
+
+def fake_extraction(messages):
+    previous = parse_previous(messages[-1].get('content', '')) if messages else None
+    if not isinstance(previous, dict):
+        previous = {}
+    parameters = previous.get('parameter_list')
+    if not parameters:
+        # The config table follows the system prompt, or is sent as the first user message by chain_extract
+        names = next((names for names in (prompt_parameters(m.get('content') or '') for m in messages[:2]) if names), [])
+        parameters = [{'Parameter': name, 'Value': None, 'Units': None} for name in names]
+    for row in parameters:
+        if isinstance(row, dict) and row.get('Value') is None:
+            row['Value'] = float(zlib.crc32(str(row.get('Parameter')).encode()) % 100_000)
+    return {
+        'reporting_year': previous.get('reporting_year') or document_year(messages),
+        'parameter_list': parameters,
+    }
+
+
+class StandinState:
+    """Fault injection settings and request counters shared by the handler threads"""
+
+    def __init__(self, latency=0.0, jitter=0.0, rate_limit=0.0, error_rate=0.0, max_concurrent=0, retry_after=1, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.error_rate = error_rate
+        self.max_concurrent = max_concurrent
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.active = 0
+        self.counts = {'requests': 0, 'ok': 0, 'rate_limited': 0, 'error': 0, 'peak_concurrent': 0}
+
+    def admit(self):
+        """Decide the fate of a request: 'ok', 'rate_limited' or 'error', and the delay before answering"""
+        with self._lock:
+            self.counts['requests'] += 1
+            self.active += 1
+            self.counts['peak_concurrent'] = max(self.counts['peak_concurrent'], self.active)
+            draw = self._random.random()
+            delay = max(self.latency + self._random.uniform(-self.jitter, self.jitter), 0.0)
+            if (self.max_concurrent and self.active > self.max_concurrent) or draw < self.rate_limit:
+                outcome = 'rate_limited'
+            elif draw < self.rate_limit + self.error_rate:
+                outcome = 'error'
+            else:
+                outcome = 'ok'
+            self.counts[outcome] += 1
+        return outcome, delay
+
+    def release(self):
+        with self._lock:
+            self.active -= 1
+
+    def stats(self):
+        with self._lock:
+            return {**self.counts, 'active': self.active}
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    state = None
+
+    def do_GET(self):
+        if self.path.rstrip('/') == '/stats':
+            self.send_json(200, self.state.stats())
+        else:
+            self.send_json(404, {'error': {'message': 'Not found'}})
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if not self.path.split('?')[0].endswith('/chat/completions'):
+            self.send_json(404, {'error': {'message': 'Not found'}})
+            return
+        try:
+            request = json.loads(body)
+        except ValueError:
+            self.send_json(400, {'error': {'message': 'Invalid JSON body'}})
+            return
+
+        outcome, delay = self.state.admit()
+        try:
+            if outcome == 'rate_limited':
+                self.send_json(429, {'error': {'code': '429', 'message': 'Rate limit exceeded'}},
+                               {'Retry-After': str(self.state.retry_after)})
+                return
+            time.sleep(delay)
+            if outcome == 'error':
+                self.send_json(500, {'error': {'code': 'InternalServerError', 'message': 'Injected failure'}})
+                return
+            messages = request.get('messages') or []
+            content = json.dumps(fake_extraction(messages))
+            prompt_tokens = sum(len(m.get('content') or '') for m in messages) // 4
+            completion_tokens = len(content) // 4
+            self.send_json(200, {
+                'id': f"chatcmpl-{uuid.uuid4().hex[:24]}",
+                'object': 'chat.completion',
+                'created': int(time.time()),
+                'model': request.get('model', 'standin'),
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': content},
+                    'finish_reason': 'stop'
+                }],
+                'usage': {
+                    'prompt_tokens': prompt_tokens,
+                    'completion_tokens': completion_tokens,
+                    'total_tokens': prompt_tokens + completion_tokens
+                }
+            })
+        finally:
+            self.state.release()
+
+    def send_json(self, status, payload, headers=None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+
+def make_server(host='127.0.0.1', port=8765, **options):
+    handler = type('Handler', (StandinHandler,), {'state': StandinState(**options)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def start(host='127.0.0.1', port=8765, **options):
+    """Serve from a background thread, e.g. inside a benchmark; stop with server.shutdown()"""
+    server = make_server(host, port, **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local chat-completions stand-in with latency and fault injection")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=1.0, help="mean seconds before answering")
+    parser.add_argument('--jitter', type=float, default=0.0, help="uniform +/- seconds around the mean latency")
+    parser.add_argument('--rate-limit', type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument('--max-concurrent', type=int, default=0, help="answer 429 above this many requests in flight")
+    parser.add_argument('--retry-after', type=int, default=1, help="Retry-After seconds sent with each 429")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of requests answered with 500")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = make_server(
+        args.host, args.port, latency=args.latency, jitter=args.jitter, rate_limit=args.rate_limit,
+        error_rate=args.error_rate, max_concurrent=args.max_concurrent, retry_after=args.retry_after, seed=args.seed
+    )
+    logger.info(f"LLM stand-in listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        logger.info(f"Served {server.RequestHandlerClass.state.stats()}")
+
+
+if __name__ == '__main__':
+    main()
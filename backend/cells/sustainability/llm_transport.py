@@ -0,0 +1,158 @@
+import json
+import os
+import tempfile
+import threading
+import time
+
+import httpx
+from openai import AzureOpenAI
+from decouple import config
+
+from cells.base.disk_cache import make_key
+
+TRANSPORTS = ('live', 'record', 'replay', 'local')
+
+
+def fixture_key(messages):
+    """Fixtures are addressed by the conversation alone, so a recording replays under any deployment name"""
+    return make_key(messages)
+
+
+def completion_result(completion):
+    usage = getattr(completion, 'usage', None)
+    return {
+        'content': completion.choices[0].message.content,
+        'prompt_tokens': (usage.prompt_tokens or 0) if usage is not None else None,
+        'completion_tokens': (usage.completion_tokens or 0) if usage is not None else None,
+    }
+
+
+class AzureTransport:
+    """Chat completions over a pooled keep-alive connection, to Azure OpenAI or anything speaking its protocol"""
+
+    def __init__(self, max_connections, timeout, endpoint=None, api_key=None, api_version=None):
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.endpoint = endpoint
+        self.api_key = api_key
+        self.api_version = api_version
+        self._client = None
+        self._http_client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._http_client = httpx.Client(
+                        limits=httpx.Limits(
+                            max_connections=self.max_connections,
+                            max_keepalive_connections=self.max_connections
+                        ),
+                        timeout=self.timeout
+                    )
+                    # Credentials are only needed once a request is actually sent
+                    self._client = AzureOpenAI(
+                        api_key=self.api_key or config("OPEN_API_KEY"),
+                        api_version=self.api_version or config("API_VERSION"),
+                        azure_endpoint=self.endpoint or config("AZURE_ENDPOINT"),
+                        http_client=self._http_client
+                    )
+        return self._client
+
+    def chat(self, model, messages):
+        completion = self.client.chat.completions.create(
+            model=model,
+            response_format={"type": "json_object"},
+            messages=messages
+        )
+        return completion_result(completion)
+
+    def pool_stats(self):
+        return {'initialised': self._client is not None, 'max_connections': self.max_connections}
+
+
+class FixtureStore:
+    """Recorded chat completions, one JSON file per conversation so fixtures can be read and diffed"""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.json')
+
+    def get(self, key):
+        try:
+            with open(self._path(key)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def set(self, key, fixture):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(fixture, f, indent=1)
+        os.replace(tmp_path, path)
+
+
+class RecordingTransport:
+    """Send requests through another transport and store every response as a fixture"""
+
+    def __init__(self, transport, store):
+        self.transport = transport
+        self.store = store
+
+    def chat(self, model, messages):
+        start = time.perf_counter()
+        result = self.transport.chat(model, messages)
+        self.store.set(fixture_key(messages), {
+            'model': model,
+            'messages': messages,
+            'latency': round(time.perf_counter() - start, 3),
+            **result
+        })
+        return result
+
+    def pool_stats(self):
+        return self.transport.pool_stats()
+
+
+class FixtureMissing(LookupError):
+    pass
+
+
+class ReplayTransport:
+    """Answer from recorded fixtures only, never the network; optionally taking as long as the recording did"""
+
+    def __init__(self, store, replay_latency=False):
+        self.store = store
+        self.replay_latency = replay_latency
+
+    def chat(self, model, messages):
+        key = fixture_key(messages)
+        fixture = self.store.get(key)
+        if fixture is None:
+            raise FixtureMissing(f"No recorded LLM response for request {key[:12]} in {self.store.directory}")
+        if self.replay_latency and fixture.get('latency'):
+            time.sleep(fixture['latency'])
+        return {name: fixture.get(name) for name in ('content', 'prompt_tokens', 'completion_tokens')}
+
+    def pool_stats(self):
+        return {'initialised': False, 'max_connections': 0}
+
+
+def make_transport(mode, max_connections, timeout, fixture_dir, local_url=None, replay_latency=False):
+    if mode not in TRANSPORTS:
+        raise ValueError(f"Unknown LLM transport {mode!r}, expected one of {', '.join(TRANSPORTS)}")
+    if mode == 'replay':
+        return ReplayTransport(FixtureStore(fixture_dir), replay_latency)
+    if mode == 'local':
+        # The stand-in accepts any key and version, so none need configuring
+        return AzureTransport(max_connections, timeout, endpoint=local_url, api_key='local', api_version='2024-02-01')
+    transport = AzureTransport(max_connections, timeout)
+    if mode == 'record':
+        return RecordingTransport(transport, FixtureStore(fixture_dir))
+    return transport
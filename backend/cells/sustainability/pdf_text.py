@@ -0,0 +1,162 @@
+import logging
+import os
+import tempfile
+import threading
+from collections import deque
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pdfplumber
+
+from config.settings import PDF_TEXT_PROCESSES, PDF_PAGES_PER_SHARD
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Process pool shared by every extraction thread, started on first use"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                # spawn avoids forking the multi-threaded web worker
+                _executor = ProcessPoolExecutor(
+                    max_workers=PDF_TEXT_PROCESSES,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+    return _executor
+
+
+def iter_page_range(path, start=0, stop=None):
+    """Yield the layout text of pages [start, stop) one at a time, releasing each page's parsed objects"""
+    pages = None if stop is None else list(range(start + 1, stop + 1))
+    with pdfplumber.open(path, pages=pages) as pdf:
+        for page in pdf.pages:
+            text = page.extract_text(layout=True)
+            page.close()
+            yield text
+
+
+def extract_page_range(path, start, stop):
+    """Layout text of pages [start, stop) read by a single worker"""
+    return list(iter_page_range(path, start, stop))
+
+
+def page_count(path):
+    with pdfplumber.open(path) as pdf:
+        return len(pdf.pages)
+
+
+def page_shards(n_pages, pages_per_shard=None):
+    if pages_per_shard is None:
+        pages_per_shard = PDF_PAGES_PER_SHARD
+    return [(start, min(start + pages_per_shard, n_pages)) for start in range(0, n_pages, pages_per_shard)]
+
+
+def iter_pdf_pages(path, processes=None, pages_per_shard=None):
+    """Yield the layout text of every page in order.
+
+    With more than one process the page-range shards are extracted by the shared pool,
+    keeping only a small window of shards in flight so memory does not grow with page count.
+    """
+    if processes is None:
+        processes = PDF_TEXT_PROCESSES
+    if processes <= 1:
+        yield from iter_page_range(path)
+        return
+
+    n_pages = page_count(path)
+    shards = page_shards(n_pages, pages_per_shard)
+    if len(shards) <= 1:
+        yield from iter_page_range(path)
+        return
+
+    executor = get_executor()
+    pending = deque()
+    shards = iter(shards)
+    done = 0
+    try:
+        while True:
+            while len(pending) < processes:
+                shard = next(shards, None)
+                if shard is None:
+                    break
+                pending.append((shard, executor.submit(extract_page_range, path, *shard)))
+            if not pending:
+                return
+            (start, stop), future = pending.popleft()
+            texts = future.result()
+            yield from texts
+            done = stop
+    except BrokenProcessPool as e:
+        # Drop the dead pool so the next document starts a fresh one
+        logger.error(f"PDF text worker pool failed, extracting {path} inline from page {done + 1}: {str(e)}")
+        reset_executor(executor)
+        pending.clear()
+        yield from iter_page_range(path, done, n_pages)
+    finally:
+        for _, future in pending:
+            future.cancel()
+
+
+def extract_pdf_pages(path, processes=None, pages_per_shard=None):
+    """Layout text of every page, in page order"""
+    return list(iter_pdf_pages(path, processes, pages_per_shard))
+
+
+def reset_executor(executor):
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+class PageSpool:
+    """Page texts written to a temporary file as they stream past, read back by page number.
+
+    Lets a pass that needs the whole document (relevance scoring, the CDP question index) see every page
+    first while only the pages it picks are held in memory afterwards. Reads are safe from several threads.
+    """
+
+    def __init__(self):
+        self._file = tempfile.TemporaryFile()
+        self._offsets = []
+        self._end = 0
+        self._flushed = True
+        self._lock = threading.Lock()
+
+    def append(self, text):
+        data = text.encode('utf-8')
+        self._file.write(data)
+        self._offsets.append((self._end, len(data)))
+        self._end += len(data)
+        self._flushed = False
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __getitem__(self, i):
+        if not self._flushed:
+            with self._lock:
+                self._file.flush()
+                self._flushed = True
+        start, size = self._offsets[i]
+        return os.pread(self._file.fileno(), size, start).decode('utf-8')
+
+    def pages(self, indices):
+        for i in indices:
+            yield self[i]
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,45 @@
+import re
+from collections import defaultdict
+
+# CDP question codes such as (C6.1), C6.5 or C8.2a
+QUESTION_RE = re.compile(r"\b(C\d{1,2}\.\d{1,2})[a-z]{0,2}\b")
+
+# Questions whose answers hold each scope's parameters
+SCOPE_QUESTION_CODES = {
+    'Scope 1': ['C6.1', 'C7.1', 'C7.2', 'C7.3'],
+    'Scope 2': ['C6.3', 'C7.5', 'C7.6', 'C7.7', 'C8.2'],
+    'Scope 3': ['C6.5'],
+}
+
+
+class QuestionIndex:
+    """Maps CDP question codes to the pages that hold their answers, built page by page"""
+
+    def __init__(self):
+        self.pages = defaultdict(set)
+        self.page_count = 0
+        self._current = None
+
+    def add_page(self, text):
+        page = self.page_count
+        self.page_count += 1
+        # A question's answer runs on from the page it is asked on until the next question starts
+        if self._current is not None:
+            self.pages[self._current].add(page)
+        for match in QUESTION_RE.finditer(text):
+            self._current = match.group(1)
+            self.pages[self._current].add(page)
+
+    def pages_for(self, codes):
+        found = set()
+        for code in codes:
+            found.update(self.pages.get(code, ()))
+        return sorted(found)
+
+    def scope_pages(self, scopes):
+        """Page numbers per scope; scopes without any indexed question get None"""
+        scope_pages = {}
+        for scope in scopes:
+            pages = self.pages_for(SCOPE_QUESTION_CODES.get(scope, []))
+            scope_pages[scope] = pages if len(pages) > 0 else None
+        return scope_pages
@@ -0,0 +1,113 @@
+import re
+from collections import Counter
+
+import numpy as np
+
+from config.settings import RELEVANCE_PAGES_PER_PARAMETER, RELEVANCE_NEIGHBOURS
+
+TOKEN_RE = re.compile(r"[a-z]+|\d[\d,.]*\d|\d")
+NUMBER_RE = re.compile(r"^\d")
+STOPWORDS = {
+    'a', 'an', 'and', 'as', 'at', 'by', 'for', 'from', 'in', 'into', 'is', 'it', 'its', 'of', 'on', 'or',
+    'part', 'related', 'that', 'the', 'their', 'them', 'to', 'total', 'was', 'were', 'which', 'with',
+    'company', 'amount',
+}
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+def parameter_queries(config_sheet):
+    """Weighted query terms for each parameter, name terms counting twice as much as description terms"""
+    queries = {}
+    for _, row in config_sheet.iterrows():
+        terms = Counter()
+        for term in tokenize(str(row['Parameter'])):
+            if term not in STOPWORDS and not NUMBER_RE.match(term):
+                terms[term] += 2
+        description = row['Description'] if 'Description' in row and isinstance(row['Description'], str) else ''
+        for term in tokenize(description):
+            if term not in STOPWORDS and not NUMBER_RE.match(term):
+                terms[term] += 1
+        if len(terms) > 0:
+            queries[row['Parameter']] = dict(terms)
+    return queries
+
+
+def query_terms(queries):
+    return {term for query in queries.values() for term in query}
+
+
+class PageIndex:
+    """BM25 index over the pages of one document, boosted by how number-dense each page is.
+
+    Pages are added one at a time as they stream past. With terms given, only those terms are counted,
+    so the index holds a few numbers per page rather than the page text; scores for queries made of
+    those terms are the same as with every term counted.
+    """
+
+    def __init__(self, terms=None, k1=1.5, b=0.75):
+        self.terms = terms
+        self.k1 = k1
+        self.b = b
+        self.term_counts = []
+        self.lengths = []
+        self.numbers = []
+        self.doc_freq = Counter()
+
+    def add_page(self, page):
+        tokens = tokenize(page)
+        counts = Counter(tokens if self.terms is None else (t for t in tokens if t in self.terms))
+        self.term_counts.append(counts)
+        self.lengths.append(len(tokens))
+        self.numbers.append(sum(1 for t in tokens if NUMBER_RE.match(t)))
+        self.doc_freq.update(counts.keys())
+
+    def __len__(self):
+        return len(self.term_counts)
+
+    def score(self, query):
+        n = len(self.term_counts)
+        lengths = np.array(self.lengths, dtype=float)
+        avg_length = lengths.mean() if n > 0 and lengths.mean() > 0 else 1.0
+        number_density = np.array(self.numbers, dtype=float) / np.maximum(lengths, 1)
+        scores = np.zeros(n)
+        norm = self.k1 * (1 - self.b + self.b * lengths / avg_length)
+        for term, weight in query.items():
+            f = self.doc_freq.get(term)
+            if f is None:
+                continue
+            idf = np.log(1 + (n - f + 0.5) / (f + 0.5))
+            tf = np.array([counts.get(term, 0) for counts in self.term_counts], dtype=float)
+            scores += weight * idf * tf * (self.k1 + 1) / (tf + norm)
+        return scores * (1 + number_density)
+
+    def select(self, queries, pages_per_parameter=None, neighbours=None):
+        """Indices, in page order, of the best-scoring pages for each parameter plus their neighbours"""
+        if pages_per_parameter is None:
+            pages_per_parameter = RELEVANCE_PAGES_PER_PARAMETER
+        if neighbours is None:
+            neighbours = RELEVANCE_NEIGHBOURS
+        n = len(self)
+        if pages_per_parameter <= 0 or len(queries) == 0 or n <= pages_per_parameter * (2 * neighbours + 1):
+            return list(range(n))
+
+        selected = set()
+        for query in queries.values():
+            scores = self.score(query)
+            for i in np.argsort(-scores, kind='stable')[:pages_per_parameter]:
+                if scores[i] <= 0:
+                    break
+                selected.update(range(max(0, i - neighbours), min(n, i + neighbours + 1)))
+        if len(selected) == 0:
+            return list(range(n))
+        return sorted(int(i) for i in selected)
+
+
+def select_pages(pages, queries, pages_per_parameter=None, neighbours=None):
+    """Indices, in page order, of the best-scoring pages for each parameter plus their neighbours"""
+    index = PageIndex(query_terms(queries))
+    for page in pages:
+        index.add_page(page)
+    return index.select(queries, pages_per_parameter, neighbours)
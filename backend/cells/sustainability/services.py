@@ -8,13 +8,35 @@ import shutil
 from datetime import datetime
 
 from cells.base.helpers import clear_directory
-from cells.sustainability.get_ccf_data import generate_explainability_text, get_ongil_ccf_estimates
+from cells.sustainability.get_ccf_data import read_estimator_inputs, what_if_predictors, estimate_company
 from ..base.cell import BaseCell
-from ..base.serializers import FileUploadSerializer, SessionIdSerializer
+from ..base.serializers import FileUploadSerializer, WhatIfEstimatorSerializer, BatchEstimatorSerializer, TableFormatSerializer
+from ..base.results import table_payload
+from ..base.metrics import span
 from .data_extraction import process_cdp_report, process_annual_report
+from .ccf_models import load_models, save_models
+from .config_workbook import load_config, replace_config
+from .ccf_batch import estimate_companies, combine_results, write_batch_output
 
-from config.settings import MEDIA_ROOT
+from config.settings import MEDIA_ROOT, CCF_BATCH_MAX_COMPANIES
 UPLOAD_DIR = os.path.join(MEDIA_ROOT, 'app_files')
+CONFIG_PATH = f"{MEDIA_ROOT}/required/beverage_config.xlsx"
+DEFAULT_COMPANY = 'The Coca Cola Company'
+
+
+def session_report_paths(session_id):
+    """The CDP and annual report extractions a session's estimates are built from"""
+    return (
+        f"{UPLOAD_DIR}/{session_id}/CDPExtractorCell/output/CDPExtractorCell.xlsx",
+        f"{UPLOAD_DIR}/{session_id}/AnnualReportExtractorCell/output/AnnualReportExtractorCell.xlsx",
+    )
+
+
+def estimates_payload(estimates, format_serializer):
+    if format_serializer.validated_data.get('format') == 'columnar':
+        # Typed columns, first page only; the rest is paged from the results endpoint
+        return table_payload(estimates, limit=format_serializer.validated_data.get('limit'))
+    return estimates.fillna('').to_dict(orient='records')
 
 
 class CDPExtractorCell(BaseCell):
@@ -54,18 +76,24 @@ class CDPExtractorCell(BaseCell):
 
             for file in files:
                 if "config" in file.name:
-                    with open(config_path, "wb") as destination:
-                        for chunk in file.chunks():
-                            destination.write(chunk)
+                    # Swapped in whole once it parses, so concurrent requests keep the previous workbook until then
+                    replace_config(config_path, b''.join(file.chunks()))
                 else:
                     with open(f"{UPLOAD_DIR}/{session_id}/{self.__class__.__name__}/input/{file.name}", "wb") as destination:
                         for chunk in file.chunks():
                             destination.write(chunk)
 
             logger.info("Processing files...")
+            stats = {'document_cache': {'hits': 0, 'misses': 0}, 'question_index': {'pages_total': 0, 'pages_sent': 0},
+                     'normalise': {'chars_removed': 0, 'tokens_removed': 0, 'lines_dropped': 0, 'pages_dropped': 0},
+                     'map_reduce': {'batches': 0, 'conflicts': 0, 'conflicting_parameters': []}}
 
             try:
-                df = process_cdp_report(input_folder_path, output_folder_path, config_path)
+                df = process_cdp_report(
+                    input_folder_path, output_folder_path, config_path,
+                    use_cache=serializer.validated_data.get('use_cache', True),
+                    stats=stats
+                )
             except Exception as e:
                 logger.error(f"Error processing CDP report: {str(e)}")
                 return {
@@ -81,7 +109,8 @@ class CDPExtractorCell(BaseCell):
 
             try:
                 logger.info("Writing output DataFrame to Excel file...")
-                df.to_excel(output_file_path, index=False)
+                with span('excel_write'):
+                    df.to_excel(output_file_path, index=False)
             except Exception as e:
                 logger.error(f"Error writing output file: {str(e)}")
                 return {
@@ -97,6 +126,10 @@ class CDPExtractorCell(BaseCell):
                     'output_path': output_file_url,
                     'metadata': {
                         'file_count': len(files),
+                        'document_cache': stats['document_cache'],
+                        'question_index': stats['question_index'],
+                        'normalise': stats['normalise'],
+                        'map_reduce': stats['map_reduce'],
                         'extraction_timestamp': datetime.now().isoformat()
                     },
                     'error': None
@@ -153,9 +186,16 @@ class AnnualReportExtractorCell(BaseCell):
                         destination.write(chunk)
 
             logger.info("Processing files...")
+            stats = {'document_cache': {'hits': 0, 'misses': 0}, 'relevance': {'pages_total': 0, 'pages_sent': 0},
+                     'normalise': {'chars_removed': 0, 'tokens_removed': 0, 'lines_dropped': 0, 'pages_dropped': 0},
+                     'map_reduce': {'batches': 0, 'conflicts': 0, 'conflicting_parameters': []}}
 
             try:
-                df = process_annual_report(input_folder_path, config_path)
+                df = process_annual_report(
+                    input_folder_path, config_path,
+                    use_cache=serializer.validated_data.get('use_cache', True),
+                    stats=stats
+                )
             except Exception as e:
                 logger.error(f"Error processing {self.__class__.__name__} report: {str(e)}")
                 return {
@@ -171,7 +211,8 @@ class AnnualReportExtractorCell(BaseCell):
 
             try:
                 logger.info("Writing output DataFrame to Excel file...")
-                df.to_excel(output_file_path, index=False)
+                with span('excel_write'):
+                    df.to_excel(output_file_path, index=False)
             except Exception as e:
                 logger.error(f"Error writing output file: {str(e)}")
                 return {
@@ -187,6 +228,10 @@ class AnnualReportExtractorCell(BaseCell):
                     'output_path': output_file_url,
                     'metadata': {
                         'file_count': len(files),
+                        'document_cache': stats['document_cache'],
+                        'relevance': stats['relevance'],
+                        'normalise': stats['normalise'],
+                        'map_reduce': stats['map_reduce'],
                         'extraction_timestamp': datetime.now().isoformat()
                     },
                     'error': None
@@ -204,8 +249,8 @@ class AnnualReportExtractorCell(BaseCell):
 
 class CCFEstimatorCell(BaseCell):
     def validate_input(self, data):
-        serializer = SessionIdSerializer(data=data)
-        if serializer.is_valid():
+        serializer = WhatIfEstimatorSerializer(data=data)
+        if serializer.is_valid() and TableFormatSerializer(data=data).is_valid():
             return True
         else:
             return False
@@ -216,15 +261,17 @@ class CCFEstimatorCell(BaseCell):
 
         logger = logging.getLogger(__name__)
 
-        serializer = SessionIdSerializer(data=data)
+        serializer = WhatIfEstimatorSerializer(data=data)
         if serializer.is_valid():
             pass
 
         session_id = serializer.validated_data.get('session_id')
+        company = serializer.validated_data.get('company') or DEFAULT_COMPANY
+        what_if = serializer.validated_data.get('what_if')
+        format_serializer = TableFormatSerializer(data=data)
+        format_serializer.is_valid()
 
-        cdp_report_path = f"{UPLOAD_DIR}/{session_id}/CDPExtractorCell/output/CDPExtractorCell.xlsx"
-        annual_report_path = f"{UPLOAD_DIR}/{session_id}/AnnualReportExtractorCell/output/AnnualReportExtractorCell.xlsx"
-        config_path = f"{MEDIA_ROOT}/required/beverage_config.xlsx"
+        cdp_report_path, annual_report_path = session_report_paths(session_id)
 
         output_folder_path = f"{UPLOAD_DIR}/{session_id}/{self.__class__.__name__}/output"
         os.makedirs(output_folder_path, exist_ok=True)
@@ -232,52 +279,35 @@ class CCFEstimatorCell(BaseCell):
         try:
             logger.info("Reading CDP report and annual report files...")
 
-            # Read the CDP report
-            df = pd.read_excel(cdp_report_path).rename(columns={"Unit": 'Units'})
-            if 'Activity' not in df.columns:
-                df['Activity'] = 'Total'
-            df['Year'] = df['Year'].astype(int)
-            df.loc[df['Units'] != 'MWh','Units'] = 'metric tonnes CO2e'
-            
-            # Read the annual report
-            predictors_long = pd.read_excel(annual_report_path).rename(columns={"Unit": 'Units'})
-            predictors = predictors_long.set_index(['Year', 'Parameter'])['Value'].unstack('Parameter').reset_index()
-
-            # Load configuration data
-            config_dict = pd.read_excel(config_path, sheet_name=None)
-            parameter_matrix = config_dict['Dependency Matrix']
-            predictor_config = config_dict['annual_reports']
-            param_config = config_dict['climate_reports']
-
-            # Prepare the dependency matrix
-            pred_mat = (
-                df[['Scope', 'Parameter', 'Activity']]
-                .drop_duplicates()
-                .merge(parameter_matrix, on=['Scope', 'Parameter'])
-                .set_index(['Scope', 'Parameter', 'Activity'])
-                .astype(bool)
-            )
-
-            logger.info("Generating estimates...")
-            estimates = get_ongil_ccf_estimates(df, predictors, pred_mat)
-            estimates['Ongil Estimated'] = estimates['Ongil Estimated'].fillna(0)
-
-            logger.info("Generating explainability text...")
+            with span('read_inputs'):
+                df, predictors = read_estimator_inputs(cdp_report_path, annual_report_path)
+                # Parsed configuration, re-read only when the workbook changes
+                config_dict = load_config(CONFIG_PATH).sheets
+
+            logger.info("Generating estimates and explainability text...")
             # graph_dicts = get_graph_links(df=estimates, inputs=predictors_long, matrix=pred_mat)
-            chk = generate_explainability_text(pred_mat, predictor_config, param_config, company='The Coca Cola Company')
+            # Series unchanged since the session's last estimate reuse their fitted models
+            models = load_models(session_id)
+            scenario = what_if_predictors(predictors, what_if) if what_if else None
+            estimates, pred_mat, chk = estimate_company(df, predictors, config_dict, company, models, scenario)
+            save_models(session_id, models)
             dependencies = pred_mat.join(chk)
 
-            # Write outputs to Excel file
-            output_file_path = os.path.join(output_folder_path, f'{self.__class__.__name__}.xlsx')
-            with pd.ExcelWriter(output_file_path) as writer:
-                estimates.to_excel(writer, sheet_name='Data', index=False)
-                dependencies.to_excel(writer, sheet_name='Dependencies')
+            output_file_url = None
+            # A what-if query leaves the session's estimates workbook as it was
+            if not what_if:
+                # Write outputs to Excel file
+                output_file_path = os.path.join(output_folder_path, f'{self.__class__.__name__}.xlsx')
+                with span('excel_write'), pd.ExcelWriter(output_file_path) as writer:
+                    estimates.to_excel(writer, sheet_name='Data', index=False)
+                    dependencies.to_excel(writer, sheet_name='Dependencies')
 
-            output_file_url = urljoin(request.build_absolute_uri('/'), os.path.relpath(output_file_path))
+                output_file_url = urljoin(request.build_absolute_uri('/'), os.path.relpath(output_file_path))
 
             # Convert estimates and dependencies to JSON format
-            estimates_json = estimates.fillna('').to_dict(orient='records')
-            explainability_json = chk.reset_index().to_dict(orient='records')
+            with span('response_encode'):
+                estimates_json = estimates_payload(estimates, format_serializer)
+                explainability_json = chk.reset_index().to_dict(orient='records')
 
             logger.info("Process completed successfully.")
             return {
@@ -286,7 +316,8 @@ class CCFEstimatorCell(BaseCell):
                     'metadata': {
                         'cdp_report_path': urljoin(request.build_absolute_uri('/'), os.path.relpath(cdp_report_path)),
                         'annual_report_path': urljoin(request.build_absolute_uri('/'), os.path.relpath(annual_report_path)),
-                        'extraction_timestamp': datetime.now().isoformat()
+                        'extraction_timestamp': datetime.now().isoformat(),
+                        'what_if': what_if or None
                     },
                     'estimates': estimates_json,
                     'explanation': explainability_json,
@@ -302,3 +333,112 @@ class CCFEstimatorCell(BaseCell):
                     'error': f"Error during processing: {str(e)}"
                 }
             }
+
+
+class CCFBatchEstimatorCell(BaseCell):
+    def validate_input(self, data):
+        serializer = BatchEstimatorSerializer(data=data)
+        if not serializer.is_valid() or not TableFormatSerializer(data=data).is_valid():
+            return False
+        return len(serializer.validated_data['companies']) <= CCF_BATCH_MAX_COMPANIES
+
+    def process(self, data, *args, **kwargs):
+        request = kwargs["request"]
+        logger = logging.getLogger(__name__)
+
+        serializer = BatchEstimatorSerializer(data=data)
+        serializer.is_valid()
+        session_id = serializer.validated_data['session_id']
+        format_serializer = TableFormatSerializer(data=data)
+        format_serializer.is_valid()
+
+        output_folder_path = f"{UPLOAD_DIR}/{session_id}/{self.__class__.__name__}/output"
+        os.makedirs(output_folder_path, exist_ok=True)
+
+        try:
+            with span('read_inputs'):
+                config_dict = load_config(CONFIG_PATH).sheets
+
+            items = []
+            for entry in serializer.validated_data['companies']:
+                cdp_report_path, annual_report_path = session_report_paths(entry['session_id'])
+                items.append({
+                    'session_id': entry['session_id'],
+                    'company': entry.get('company') or entry['session_id'],
+                    'cdp_report_path': cdp_report_path,
+                    'annual_report_path': annual_report_path,
+                })
+            # Sessions without both extractions fail up front instead of in a worker
+            ready = [
+                i for i, item in enumerate(items)
+                if os.path.exists(item['cdp_report_path']) and os.path.exists(item['annual_report_path'])
+            ]
+
+            logger.info(f"Estimating {len(ready)} of {len(items)} companies...")
+            with span('ccf_batch'):
+                estimated = dict(zip(ready, estimate_companies([items[i] for i in ready], config_dict)))
+            results = []
+            for i, item in enumerate(items):
+                if i in estimated:
+                    results.append({'session_id': item['session_id'], **estimated[i]})
+                else:
+                    results.append({
+                        'session_id': item['session_id'],
+                        'company': item['company'],
+                        'error': f"Session {item['session_id']} has no CDP and annual report extractions"
+                    })
+
+            estimates, dependencies, explanation = combine_results(results)
+            summary = pd.DataFrame([
+                {
+                    'Company': r['company'],
+                    'Session': r['session_id'],
+                    'Rows': len(r['estimates']) if r['error'] is None else 0,
+                    'Error': r['error'] or ''
+                }
+                for r in results
+            ])
+
+            output_file_path = os.path.join(output_folder_path, f'{self.__class__.__name__}.xlsx')
+            with span('excel_write'):
+                write_batch_output(output_file_path, summary, estimates, dependencies)
+            output_file_url = urljoin(request.build_absolute_uri('/'), os.path.relpath(output_file_path))
+
+            with span('response_encode'):
+                estimates_json = estimates_payload(estimates, format_serializer) if estimates is not None else []
+                explainability_json = explanation.to_dict(orient='records') if explanation is not None else []
+
+            failed = sum(1 for r in results if r['error'] is not None)
+            logger.info(f"Batch estimated {len(results) - failed} of {len(results)} companies")
+            return {
+                'data': {
+                    'output_path': output_file_url,
+                    'results': [
+                        {
+                            'company': r['company'],
+                            'session_id': r['session_id'],
+                            'row_count': len(r['estimates']) if r['error'] is None else 0,
+                            'error': r['error']
+                        }
+                        for r in results
+                    ],
+                    'metadata': {
+                        'company_count': len(results),
+                        'succeeded': len(results) - failed,
+                        'failed': failed,
+                        'extraction_timestamp': datetime.now().isoformat()
+                    },
+                    'estimates': estimates_json,
+                    'explanation': explainability_json,
+                    'error': None if failed < len(results) else "No company could be estimated"
+                }
+            }
+
+        except Exception as e:
+            logger.exception(f"Error during batch processing: {str(e)}")
+            return {
+                'data': {
+                    'output_path': None,
+                    'error': f"Error during processing: {str(e)}"
+                }
+            }
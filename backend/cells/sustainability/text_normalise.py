@@ -0,0 +1,158 @@
+import re
+import heapq
+from collections import Counter
+
+from config.settings import BOILERPLATE_MIN_PAGES
+
+PAGE_NO_RE = re.compile(r"^\s*\d+\s*$")
+DIGIT_RE = re.compile(r"\d")
+# How many non-blank lines at each end of a page can hold headers and footers
+EDGE_LINES = 3
+# Pages read before emitting anything, so headers are learned before the first page goes out
+WARMUP_PAGES = 5
+# Near-duplicate pages share this fraction of their word shingles and carry exactly the same numbers
+SHINGLE_WORDS = 5
+NEAR_DUPLICATE_JACCARD = 0.9
+# Smallest shingle hashes kept per page; only pages sharing half of them are compared in full
+SKETCH_SIZE = 16
+NUMBER_RE = re.compile(r"\d[\d,.]*")
+
+
+def is_page_number(line, page_number):
+    return PAGE_NO_RE.match(line) is not None and int(line) == page_number
+
+
+def strip_page_numbers(lines, page_number):
+    """Drop blank lines and the page number from both ends of a page"""
+    start, end = 0, len(lines)
+    while end > start and (lines[end - 1].strip() == '' or is_page_number(lines[end - 1], page_number)):
+        end -= 1
+    while start < end and (lines[start].strip() == '' or is_page_number(lines[start], page_number)):
+        start += 1
+    return lines[start:end]
+
+
+def shingles(words):
+    if len(words) <= SHINGLE_WORDS:
+        return {' '.join(words)}
+    return {' '.join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def edge_indices(lines):
+    """Positions of the first and last few non-blank lines of a page"""
+    filled = [i for i, x in enumerate(lines) if x.strip() != '']
+    return set(filled[:EDGE_LINES] + filled[-EDGE_LINES:])
+
+
+class PageNormaliser:
+    """Streaming layout-text cleaner shared by the PDF extraction paths.
+
+    Strips page-number footers, running headers/footers and the common left margin,
+    drops blank and near-duplicate pages, and keeps count of what it removed. A page is a
+    near-duplicate of an earlier one when their word shingles overlap by NEAR_DUPLICATE_JACCARD
+    and both hold the same numbers, so a page differing in any figure is always kept.
+    """
+
+    def __init__(self, line_sep='\n', page_end='', min_pages=None):
+        self.line_sep = line_sep
+        self.page_end = page_end
+        self.min_pages = BOILERPLATE_MIN_PAGES if min_pages is None else min_pages
+        self.edge_counts = Counter()
+        self.boilerplate = set()
+        # Numbers and shingle sets of the pages kept so far, found through their sketch hashes
+        self.kept_pages = []
+        self.sketch_index = {}
+        self.chars_removed = 0
+        self.lines_dropped = 0
+        self.pages_dropped = 0
+
+    def learn(self, lines):
+        # Only digit-free lines are candidates, so repeated figures are never dropped
+        candidates = {lines[i].strip() for i in edge_indices(lines) if DIGIT_RE.search(lines[i]) is None}
+        for line in candidates:
+            self.edge_counts[line] += 1
+            if self.edge_counts[line] >= self.min_pages:
+                self.boilerplate.add(line)
+
+    def is_near_duplicate(self, page):
+        numbers = sorted(NUMBER_RE.findall(page))
+        page_shingles = shingles(page.lower().split())
+        sketch = heapq.nsmallest(SKETCH_SIZE, {hash(x) for x in page_shingles})
+        shared = Counter(i for h in sketch for i in self.sketch_index.get(h, ()))
+        for i, count in shared.items():
+            other_numbers, other = self.kept_pages[i]
+            if count * 2 < len(sketch) or other_numbers != numbers:
+                continue
+            common = len(other & page_shingles)
+            if common >= NEAR_DUPLICATE_JACCARD * (len(other) + len(page_shingles) - common):
+                return True
+        for h in sketch:
+            self.sketch_index.setdefault(h, []).append(len(self.kept_pages))
+        self.kept_pages.append((numbers, page_shingles))
+        return False
+
+    def drop_lines(self, lines, kept):
+        # A dropped line takes its newline with it
+        self.lines_dropped += len(lines) - len(kept)
+        self.chars_removed += sum(len(x) + 1 for x in lines) - sum(len(x) + 1 for x in kept)
+
+    def normalise(self, lines, page_number):
+        stripped = strip_page_numbers(lines, page_number)
+        self.chars_removed += sum(len(x) + 1 for x in lines) - sum(len(x) + 1 for x in stripped)
+        edges = edge_indices(stripped)
+        kept = [x for i, x in enumerate(stripped) if not (i in edges and x.strip() in self.boilerplate)]
+        self.drop_lines(stripped, kept)
+
+        # Every non-blank line starts with at least the margin, so slicing replaces the per-line regex
+        margins = [len(x) - len(x.lstrip(' ')) for x in kept if x != '']
+        if len(margins) > 0:
+            margin = min(margins)
+            self.chars_removed += margin * len(margins)
+            kept = [x[margin:] for x in kept]
+        # Blank lines and indentation left at either end once boilerplate is gone
+        start, end = 0, len(kept)
+        while start < end and kept[start] == '':
+            start += 1
+        while end > start and kept[end - 1] == '':
+            end -= 1
+        self.chars_removed += start + len(kept) - end
+        kept = kept[start:end]
+        if len(kept) > 0:
+            self.chars_removed += len(kept[0]) - len(kept[0].lstrip())
+            kept[0] = kept[0].lstrip()
+        page = self.line_sep.join(kept)
+
+        if page == '' or self.is_near_duplicate(page):
+            self.pages_dropped += 1
+            self.chars_removed += sum(len(x) + 1 for x in kept)
+            return None
+        return page + self.page_end
+
+    def iter_pages(self, pages):
+        """Yield cleaned pages, holding back only the first few while headers are learned"""
+        buffered = []
+        for page_number, text in enumerate(pages, start=1):
+            raw = text.split('\n')
+            lines = [x.rstrip() for x in raw]
+            self.chars_removed += sum(len(x) for x in raw) - sum(len(x) for x in lines)
+            self.learn(lines)
+            buffered.append((page_number, lines))
+            if page_number < WARMUP_PAGES:
+                continue
+            for n, l in buffered:
+                page = self.normalise(l, n)
+                if page is not None:
+                    yield page
+            buffered = []
+        for n, l in buffered:
+            page = self.normalise(l, n)
+            if page is not None:
+                yield page
+
+    def stats(self):
+        return {
+            'chars_removed': self.chars_removed,
+            'tokens_removed': self.chars_removed // 4,
+            'lines_dropped': self.lines_dropped,
+            'pages_dropped': self.pages_dropped,
+        }
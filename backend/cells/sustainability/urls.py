@@ -1,8 +1,9 @@
 from django.urls import path
-from .view import CDPExtractorView, AnnualReportExtractorView, CCFEstimatorView
+from .view import CDPExtractorView, AnnualReportExtractorView, CCFEstimatorView, CCFBatchEstimatorView
 
 urlpatterns = [
     path('cdp_extractor/', CDPExtractorView.as_view(), name='cdp_extractor'),
     path('ccf_estimator/', CCFEstimatorView.as_view(), name='ccf_estimator'),
+    path('ccf_batch_estimator/', CCFBatchEstimatorView.as_view(), name='ccf_batch_estimator'),
     path('annual_report_extractor/', AnnualReportExtractorView.as_view(), name='annual_report_extractor'),
 ]
@@ -1,5 +1,5 @@
 from ..base.cell import BaseCellView
-from .services import CDPExtractorCell, CCFEstimatorCell, AnnualReportExtractorCell
+from .services import CDPExtractorCell, CCFEstimatorCell, CCFBatchEstimatorCell, AnnualReportExtractorCell
 from rest_framework.parsers import MultiPartParser
 
 
@@ -12,6 +12,10 @@ class CCFEstimatorView(BaseCellView):
     cell_class = CCFEstimatorCell
 
 
+class CCFBatchEstimatorView(BaseCellView):
+    cell_class = CCFBatchEstimatorCell
+
+
 class AnnualReportExtractorView(BaseCellView):
     parser_classes = [MultiPartParser]
     cell_class = AnnualReportExtractorCell
@@ -0,0 +1,93 @@
+import numpy as np
+
+MIN_POINTS = 3
+
+
+def fit_pairs(x, y, w):
+    """Weighted no-intercept least squares of each row of y on the same row of x, where both are present.
+
+    Returns the slope, the unweighted R² of the fitted points (as sklearn's r2_score reports it) and the
+    number of points, one entry per row. Rows with fewer than MIN_POINTS points get a NaN slope and score.
+    """
+    mask = ~np.isnan(x) & ~np.isnan(y)
+    xz = np.where(mask, x, 0.0)
+    yz = np.where(mask, y, 0.0)
+    count = mask.sum(axis=1)
+
+    sxx = (w * xz * xz).sum(axis=1)
+    sxy = (w * xz * yz).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # An all-zero predictor has no least-squares slope; lstsq returns the minimum-norm one, zero
+        beta = np.where(sxx > 0, sxy / sxx, 0.0)
+        ss_res = (((yz - beta[:, None] * xz) ** 2) * mask).sum(axis=1)
+        y_mean = yz.sum(axis=1) / count
+        ss_tot = (((yz - y_mean[:, None]) ** 2) * mask).sum(axis=1)
+        # A constant series scores 1 when fitted exactly and 0 otherwise
+        score = np.where(ss_tot > 0, 1 - ss_res / ss_tot, np.where(ss_res == 0, 1.0, 0.0))
+
+    fitted = count >= MIN_POINTS
+    return np.where(fitted, beta, np.nan), np.where(fitted, score, np.nan), count
+
+
+def fit_candidates(x, y, w, candidates):
+    """Slope and score of every candidate predictor of every series, as (series, max candidates) arrays.
+
+    x is (predictors, years), y is (series, years) and w the per-year weights; candidates lists, for each
+    series, the predictor rows in the order they are tried. Unused slots and unfittable pairs are NaN.
+    """
+    n_series = y.shape[0]
+    width = max((len(c) for c in candidates), default=0)
+    slopes = np.full((n_series, width), np.nan)
+    scores = np.full((n_series, width), np.nan)
+    if width == 0:
+        return slopes, scores
+
+    series_idx = np.repeat(np.arange(n_series), [len(c) for c in candidates])
+    position = np.concatenate([np.arange(len(c)) for c in candidates if len(c) > 0])
+    predictor_idx = np.concatenate([np.asarray(c, dtype=int) for c in candidates if len(c) > 0])
+    beta, score, _ = fit_pairs(x[predictor_idx], y[series_idx], w)
+    slopes[series_idx, position] = beta
+    scores[series_idx, position] = score
+    return slopes, scores
+
+
+def predict_candidates(x, candidates, slopes, scores):
+    """Predictions for every series from fitted candidates, following the original per-pair loop.
+
+    A candidate is taken whenever its R² is at least the best so far, and it overwrites the predictions
+    for the years where it has a value, so a later winner with gaps keeps the earlier winner's values
+    there. Years no taken candidate covers are NaN. x may hold other predictor values than the fit saw.
+    """
+    n_series, width = scores.shape
+    n_years = x.shape[1]
+    if width == 0:
+        return np.full((n_series, n_years), np.nan)
+
+    # Taken when at least as good as every earlier fitted candidate
+    valid = ~np.isnan(scores)
+    running = np.maximum.accumulate(np.where(valid, scores, -np.inf), axis=1)
+    previous_best = np.concatenate([np.full((n_series, 1), -np.inf), running[:, :-1]], axis=1)
+    taken = valid & (scores >= previous_best)
+
+    series_idx = np.repeat(np.arange(n_series), [len(c) for c in candidates])
+    position = np.concatenate([np.arange(len(c)) for c in candidates if len(c) > 0] or [np.zeros(0, dtype=int)])
+    predictor_idx = np.concatenate([np.asarray(c, dtype=int) for c in candidates if len(c) > 0] or [np.zeros(0, dtype=int)])
+    x_pad = np.full((n_series, width, n_years), np.nan)
+    x_pad[series_idx, position] = x[predictor_idx]
+
+    # For each year, the last taken candidate with a predictor value there wins
+    writes = taken[:, :, None] & ~np.isnan(x_pad)
+    last = width - 1 - np.argmax(writes[:, ::-1, :], axis=1)
+    rows = np.arange(n_series)[:, None]
+    years = np.arange(n_years)[None, :]
+    values = slopes[rows, last] * x_pad[rows, last, years]
+    return np.where(writes.any(axis=1), values, np.nan)
+
+
+def best_predictions(x, y, w, candidates):
+    """Predictions for every series from its best-scoring candidate predictor, all fitted in one pass.
+
+    Returns the (series, years) predictions and the slope and score of every candidate.
+    """
+    slopes, scores = fit_candidates(x, y, w, candidates)
+    return predict_candidates(x, candidates, slopes, scores), slopes, scores
@@ -0,0 +1,36 @@
+from django.test import SimpleTestCase
+
+from cells.sustainability.cdp_html import CDPHtmlIndex
+
+DOCUMENT = """<html><body><h1>Acme CDP Climate Change Questionnaire 2022</h1>
+<h2>C6. Emissions data</h2><p>(C6.1) What were gross Scope 1 emissions?</p><table><tr><td>100</td></tr></table>
+<p>See (C8.2) and (C6.1a) for detail.</p>
+<h2>C6. Emissions breakdown</h2><p>(C6.5) Scope 3 emissions. C8. is referenced here.</p>
+<h2>C8. Energy</h2><p>(C8.2a) Energy use</p><h2>C9. Additional metrics</h2>
+</body></html>"""
+
+
+class CDPHtmlIndexTests(SimpleTestCase):
+    def test_sections_match_str_split(self):
+        index = CDPHtmlIndex(DOCUMENT)
+        pairs = [
+            ("(C6.1)", "<h2"),
+            ("C6. Emissions", "C8."),
+            ("(C6.5)", "<h2"),
+            ("<h1", "</h1"),
+            ("(C6.1a)", "(C8.2)"),
+            ("C8. Energy", "<h2"),
+            ("C6.", "(C6.5)"),
+            ("(C8.2)", "</h1"),
+        ]
+        for start, end in pairs:
+            with self.subTest(start=start, end=end):
+                self.assertEqual(index.section(start, end), DOCUMENT.split(start)[1].split(end)[0])
+
+    def test_missing_section(self):
+        with self.assertRaises(IndexError):
+            CDPHtmlIndex(DOCUMENT).section("(C7.1)", "<h2")
+
+    def test_reporting_year(self):
+        self.assertEqual(CDPHtmlIndex(DOCUMENT).reporting_year(), 2021)
+        self.assertEqual(CDPHtmlIndex("<p>no heading</p>").reporting_year(), "0000")
@@ -0,0 +1,60 @@
+import io
+import os
+import shutil
+import tempfile
+
+import pandas as pd
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from benchmarks.synthetic import emissions_frames
+from cells.sustainability.config_workbook import ConfigProvider, ConfigWorkbook
+from cells.sustainability.get_ccf_data import estimate_company
+from cells.sustainability.relevance import parameter_queries
+
+CONFIG_PATH = os.path.join(settings.MEDIA_ROOT, 'required', 'beverage_config.xlsx')
+
+
+class ConfigWorkbookTests(SimpleTestCase):
+    def setUp(self):
+        with open(CONFIG_PATH, 'rb') as f:
+            self.content = f.read()
+
+    def test_callers_leave_the_shared_frames_unchanged(self):
+        workbook = ConfigWorkbook(self.content)
+        before = {name: sheet.copy() for name, sheet in workbook.sheets.items()}
+        scopes = {scope: frame.copy() for scope, frame in workbook.scope_parameters.items()}
+
+        df, predictors, _ = emissions_frames(workbook.sheets, years=6, activities=1)
+        estimate_company(df, predictors, workbook.sheets, 'Acme', {})
+        parameter_queries(workbook.annual_parameters)
+        for frame in workbook.scope_parameters.values():
+            frame.query('Parameter != "Total scope 3 emission"').to_string()
+
+        for name, sheet in before.items():
+            pd.testing.assert_frame_equal(workbook.sheets[name], sheet)
+        for scope, frame in scopes.items():
+            pd.testing.assert_frame_equal(workbook.scope_parameters[scope], frame)
+        with self.assertRaises(TypeError):
+            workbook.sheets['annual_reports'] = before['annual_reports']
+
+    def test_provider_parses_each_version_once(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'config.xlsx')
+        shutil.copy(CONFIG_PATH, path)
+        provider = ConfigProvider(path)
+        workbook = provider.get()
+        self.assertIs(provider.get(), workbook)
+        # Rewriting the same bytes changes the mtime but not the hash
+        shutil.copy(CONFIG_PATH, path)
+        os.utime(path, ns=(0, 0))
+        self.assertIs(provider.get(), workbook)
+        self.assertEqual(provider.loads, 1)
+
+    def test_missing_sheets_are_rejected(self):
+        buffer = io.BytesIO()
+        with pd.ExcelWriter(buffer) as writer:
+            pd.DataFrame({'Parameter': ['Revenue']}).to_excel(writer, sheet_name='annual_reports', index=False)
+        with self.assertRaisesMessage(ValueError, 'climate_reports, Dependency Matrix'):
+            ConfigWorkbook(buffer.getvalue())
@@ -0,0 +1,56 @@
+import tempfile
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from cells.base.disk_cache import DiskCache
+
+
+class DiskCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_delete_and_expiry_keep_the_size_without_rescanning(self):
+        cache = DiskCache(self.directory.name, max_bytes=1024 * 1024, ttl=60)
+        cache.set('a' * 64, b'x' * 1000)
+        cache.set('b' * 64, b'y' * 1000)
+        size = cache.stats()['bytes']
+
+        with mock.patch.object(cache, '_entries', side_effect=AssertionError("directory walked")):
+            cache.delete('a' * 64)
+            self.assertLess(cache.stats()['bytes'], size)
+            with mock.patch('cells.base.disk_cache.time.time', return_value=time.time() + 120):
+                self.assertIsNone(cache.get('b' * 64))
+            self.assertEqual(cache.stats()['bytes'], 0)
+            cache.set('c' * 64, b'z')
+            cache.delete('missing' * 8)
+
+        self.assertEqual(cache.stats()['bytes'], sum(size for _, size, _ in cache._entries()))
+
+    def test_eviction_keeps_the_newest_entries(self):
+        cache = DiskCache(self.directory.name, max_bytes=2500)
+        for i in range(5):
+            cache.set(str(i) * 64, b'x' * 1000)
+            time.sleep(0.01)
+        self.assertIsNone(cache.get('0' * 64))
+        self.assertEqual(cache.get('4' * 64), b'x' * 1000)
+        self.assertLessEqual(cache.stats()['bytes'], 2500)
+
+    def test_unreadable_entries_are_misses_and_removed(self):
+        cache = DiskCache(self.directory.name, max_bytes=1024 * 1024)
+        truncated, stale = 'a' * 64, 'b' * 64
+        cache.set(truncated, b'x' * 1000)
+        with open(cache._path(truncated), 'r+b') as f:
+            f.truncate(10)
+        # A pickle that names a class which no longer exists raises AttributeError on load
+        cache.set(stale, 1)
+        with open(cache._path(stale), 'wb') as f:
+            f.write(b'\x80\x04c' + b'cells.base.disk_cache\nMissingClass\n' + b')\x81.')
+
+        with self.assertLogs('cells.base.disk_cache', level='WARNING'):
+            self.assertEqual(cache.get(truncated, 'miss'), 'miss')
+            self.assertIsNone(cache.get(stale))
+        self.assertEqual(cache.stats()['misses'], 2)
+        self.assertEqual(list(cache._entries()), [])
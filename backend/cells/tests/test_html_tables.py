@@ -0,0 +1,50 @@
+import io
+
+import pandas as pd
+from django.test import SimpleTestCase
+
+from cells.base.html_tables import parse_html, read_tables
+
+SPANS = """
+<table>
+  <tr><th>Scope</th><th>Value</th><th>Unit</th></tr>
+  <tr><td rowspan="2">Scope 1</td><td colspan="2">1,234 "tonnes", net</td></tr>
+  <tr><td>2.5</td><td>t</td></tr>
+  <tr><td>Scope 2</td><td></td><td>-4</td></tr>
+</table>
+"""
+
+SECTIONS = """
+<table>
+  <thead><tr><th>Year</th><th>Value</th></tr><tr><th></th><th>tCO2e</th></tr></thead>
+  <tbody><tr><td>2020</td><td>1e3</td></tr><tr><td>2021</td><td>NA</td></tr></tbody>
+  <tfoot><tr><td>Total</td><td>1,000</td></tr></tfoot>
+</table>
+"""
+
+EMPTY = """
+<table></table>
+<table><tr><td></td></tr></table>
+<table><tr><td>x<br>y</td><td style="display:none">hidden</td><td>0012</td></tr></table>
+"""
+
+
+class ReadTablesTests(SimpleTestCase):
+    def assertMatchesReadHtml(self, html, header):
+        expected = pd.read_html(io.StringIO(html), header=header, flavor='lxml')
+        frames = read_tables(parse_html(html), header=header)
+        self.assertEqual(len(frames), len(expected))
+        for frame, other in zip(frames, expected):
+            pd.testing.assert_frame_equal(frame, other)
+
+    def test_rowspan_and_colspan(self):
+        for header in (None, 0):
+            self.assertMatchesReadHtml(SPANS, header)
+
+    def test_thead_and_tfoot(self):
+        for header in (None, 0):
+            self.assertMatchesReadHtml(SECTIONS, header)
+
+    def test_empty_and_hidden_cells(self):
+        for header in (None, 0):
+            self.assertMatchesReadHtml(EMPTY, header)
@@ -0,0 +1,104 @@
+import threading
+import time
+
+from django.test import SimpleTestCase
+from rest_framework.test import APIRequestFactory
+
+from cells.base.cell import BaseCell, BaseCellView
+from cells.base.jobs import JobManager, JobQueueFull, job_manager
+
+release = threading.Event()
+
+
+class EchoCell(BaseCell):
+    def validate_input(self, data):
+        return 'value' in data
+
+    def process(self, data, *args, **kwargs):
+        # Held until the test has seen the job queued or running
+        release.wait(5)
+        if data['value'] == 'fail':
+            raise ValueError("Cannot echo fail")
+        return {'data': {'echo': data['value'], 'metadata': {}, 'error': None}}
+
+
+class EchoView(BaseCellView):
+    cell_class = EchoCell
+
+
+def wait_for(job_id, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = job_manager.get(job_id)
+        if job['status'] in ('completed', 'failed'):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+
+class AsyncJobTests(SimpleTestCase):
+    def setUp(self):
+        release.clear()
+        self.factory = APIRequestFactory()
+
+    def tearDown(self):
+        release.set()
+
+    def post(self, data, query='?async=true'):
+        request = self.factory.post('/echo/' + query, data, format='json')
+        return EchoView.as_view()(request)
+
+    def test_job_lifecycle(self):
+        response = self.post({'value': 'hello'})
+        self.assertEqual(response.status_code, 202)
+        job_id = response.data['data']['job_id']
+        self.assertTrue(response.data['data']['status_url'].endswith(f'/api/cells/jobs/{job_id}/'))
+
+        status = self.client.get(f'/api/cells/jobs/{job_id}/').json()['data']
+        self.assertIn(status['status'], ('queued', 'running'))
+        self.assertIsNone(status['result'])
+
+        release.set()
+        wait_for(job_id)
+        status = self.client.get(f'/api/cells/jobs/{job_id}/').json()['data']
+        self.assertEqual(status['status'], 'completed')
+        self.assertEqual(status['status_code'], 200)
+        self.assertEqual(status['result']['echo'], 'hello')
+        self.assertIn('cell', status['result']['metadata']['stages'])
+        self.assertIsNone(status['error'])
+
+    def test_failed_job(self):
+        release.set()
+        job_id = self.post({'value': 'fail'}).data['data']['job_id']
+        wait_for(job_id)
+        status = self.client.get(f'/api/cells/jobs/{job_id}/').json()['data']
+        self.assertEqual(status['status'], 'failed')
+        self.assertEqual(status['status_code'], 400)
+        self.assertEqual(status['error'], 'Cannot echo fail')
+
+    def test_sync_request_and_invalid_input(self):
+        release.set()
+        response = self.post({'value': 'now'}, query='')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['data']['echo'], 'now')
+        self.assertEqual(self.post({'other': 1}).status_code, 400)
+
+    def test_unknown_job(self):
+        self.assertEqual(self.client.get('/api/cells/jobs/missing/').status_code, 404)
+        queue = self.client.get('/api/cells/jobs/').json()['data']['queue']
+        self.assertIn('queue_depth', queue)
+
+
+class JobManagerTests(SimpleTestCase):
+    def test_queue_limit(self):
+        manager = JobManager(max_workers=1, max_queued=1, retention=10)
+        gate = threading.Event()
+        running = manager.submit('slow', lambda: (gate.wait(5), ({}, 200))[1])
+        # The first job holds the only worker, so one more can wait and the next is refused
+        deadline = time.time() + 5
+        while manager.get(running)['status'] != 'running' and time.time() < deadline:
+            time.sleep(0.01)
+        manager.submit('queued', lambda: ({}, 200))
+        with self.assertRaises(JobQueueFull):
+            manager.submit('refused', lambda: ({}, 200))
+        gate.set()
@@ -0,0 +1,69 @@
+import threading
+import time
+
+from django.test import SimpleTestCase
+
+from cells.base.metrics import render
+from cells.sustainability.llm_gateway import LLMGateway
+
+
+class GatedTransport:
+    """Answers once released, so the test can look at the gateway while calls are in flight"""
+
+    def __init__(self, max_connections):
+        self.max_connections = max_connections
+        self.release = threading.Event()
+        self.calls = 0
+
+    def chat(self, model, messages):
+        self.calls += 1
+        self.release.wait(5)
+        return {'content': '{}', 'prompt_tokens': 10, 'completion_tokens': 2}
+
+    def pool_stats(self):
+        return {'initialised': True, 'max_connections': self.max_connections}
+
+
+def metric_lines(prefix):
+    return [line for line in render().splitlines() if line.startswith(prefix)]
+
+
+class LLMGatewayMetricsTests(SimpleTestCase):
+    def wait_until(self, condition):
+        deadline = time.time() + 5
+        while not condition() and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertTrue(condition())
+
+    def test_gauges_follow_calls_in_flight(self):
+        transport = GatedTransport(max_connections=2)
+        gateway = LLMGateway(max_in_flight=3, transport=transport)
+        messages = [[{'role': 'user', 'content': str(i)}] for i in range(4)]
+        threads = [threading.Thread(target=gateway.complete, args=(m,)) for m in messages]
+        for thread in threads:
+            thread.start()
+        self.wait_until(lambda: transport.calls == 3)
+
+        stats = gateway.stats()
+        self.assertEqual((stats['in_flight'], stats['waiting']), (3, 1))
+        self.assertEqual(stats['pool'], {'initialised': True, 'max_connections': 2, 'in_use': 2, 'peak_in_use': 2})
+        self.assertIn('llm_requests_in_flight 3', metric_lines('llm_requests_in_flight'))
+        self.assertIn('llm_requests_waiting 1', metric_lines('llm_requests_waiting'))
+        self.assertIn('llm_connections{state="in_use"} 2', metric_lines('llm_connections'))
+        self.assertIn('llm_connections{state="max"} 2', metric_lines('llm_connections'))
+
+        transport.release.set()
+        for thread in threads:
+            thread.join(5)
+        stats = gateway.stats()
+        self.assertEqual((stats['calls'], stats['in_flight'], stats['waiting']), (4, 0, 0))
+        self.assertEqual(stats['latency']['count'], 4)
+        self.assertIn('llm_requests_in_flight 0', metric_lines('llm_requests_in_flight'))
+        self.assertIn('llm_connections{state="peak_in_use"} 2', metric_lines('llm_connections'))
+        self.assertEqual(len(metric_lines('llm_recent_latency_seconds{')), 4)
+
+    def test_metrics_endpoint_lists_gateway_gauges(self):
+        LLMGateway(transport=GatedTransport(max_connections=4))
+        body = self.client.get('/api/metrics/').content.decode()
+        self.assertIn('# TYPE llm_connections gauge', body)
+        self.assertIn('llm_connections{state="max"} 4', body)
@@ -0,0 +1,35 @@
+import pandas as pd
+from django.test import SimpleTestCase
+
+from cells.sustainability.llm_standin import fake_extraction
+
+PROMPT = "Return JSON for the reporting year 20XX.\n\nParameter descriptions:\n"
+CONTEXT = pd.DataFrame({'Parameter': ['Scope 1 emissions', 'Energy use'], 'Units': ['tCO2e', 'MWh']}).to_string(index=False)
+
+
+class FakeExtractionTests(SimpleTestCase):
+    def test_year_from_user_document(self):
+        messages = [
+            {'role': 'system', 'content': PROMPT + CONTEXT},
+            {'role': 'user', 'content': 'CDP Climate Change 2022 response'},
+            {'role': 'user', 'content': 'Extract the parameter values from the above document in the requested format'},
+        ]
+        result = fake_extraction(messages)
+        self.assertEqual(result['reporting_year'], 2022)
+        self.assertEqual([row['Parameter'] for row in result['parameter_list']], ['Scope 1 emissions', 'Energy use'])
+
+    def test_year_from_system_context(self):
+        messages = [
+            {'role': 'system', 'content': PROMPT + 'Annual report 2021\n' + CONTEXT},
+            {'role': 'user', 'content': 'Extract the parameter values from the above document in the requested format'},
+        ]
+        self.assertEqual(fake_extraction(messages)['reporting_year'], 2021)
+
+    def test_previous_year_is_kept(self):
+        previous = {'reporting_year': 2019, 'parameter_list': [{'Parameter': 'Energy use', 'Value': 5.0, 'Units': 'MWh'}]}
+        messages = [
+            {'role': 'system', 'content': PROMPT + CONTEXT},
+            {'role': 'user', 'content': 'Report for 2023'},
+            {'role': 'user', 'content': f'Update the JSON with the values from the above document:{previous}'},
+        ]
+        self.assertEqual(fake_extraction(messages), previous)
@@ -0,0 +1,51 @@
+import numpy as np
+from django.test import SimpleTestCase
+
+from cells.sustainability.pdf_text import PageSpool
+from cells.sustainability.relevance import PageIndex, query_terms, select_pages
+
+QUERIES = {
+    'Revenue': {'revenue': 2, 'sales': 1},
+    'Employees': {'employees': 2, 'headcount': 1},
+}
+PAGES = [
+    "Chairman's letter about the year",
+    "Revenue grew to 1,234 million as sales rose 5%",
+    "Notes to the revenue table",
+    "Our people: 12,000 employees and a headcount up 3%",
+    "Glossary of terms",
+    "Board of directors",
+    "Risk report",
+    "Revenue by region 2021 2022 410 380 220",
+    "Contact details",
+]
+
+
+class RelevanceTests(SimpleTestCase):
+    def test_query_terms_index_scores_like_the_full_index(self):
+        full = PageIndex()
+        partial = PageIndex(query_terms(QUERIES))
+        for page in PAGES:
+            full.add_page(page)
+            partial.add_page(page)
+        for query in QUERIES.values():
+            np.testing.assert_allclose(partial.score(query), full.score(query))
+        self.assertLess(sum(map(len, partial.term_counts)), sum(map(len, full.term_counts)))
+
+    def test_select_pages(self):
+        self.assertEqual(select_pages(PAGES, QUERIES, pages_per_parameter=1, neighbours=1), [0, 1, 2, 3, 4])
+        # Pages without any query term are never picked, even when fewer than pages_per_parameter match
+        self.assertEqual(select_pages(PAGES, QUERIES, pages_per_parameter=2, neighbours=0), [1, 3, 7])
+        # Short documents are sent whole
+        self.assertEqual(select_pages(PAGES[:3], QUERIES, pages_per_parameter=1, neighbours=1), [0, 1, 2])
+
+
+class PageSpoolTests(SimpleTestCase):
+    def test_pages_read_back_in_any_order(self):
+        with PageSpool() as spool:
+            for page in PAGES + ["", "Émissions de CO₂"]:
+                spool.append(page)
+            self.assertEqual(len(spool), len(PAGES) + 2)
+            self.assertEqual(list(spool.pages([10, 1, 9])), ["Émissions de CO₂", PAGES[1], ""])
+            spool.append("late page")
+            self.assertEqual(spool[11], "late page")
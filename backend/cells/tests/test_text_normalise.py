@@ -0,0 +1,73 @@
+from django.test import SimpleTestCase
+
+from cells.sustainability.text_normalise import PageNormaliser
+
+
+def page(number, body):
+    return f"   ACME Annual Report\n\n{body}\n\n   {number}"
+
+
+BODY = "\n".join("   " + line for line in [
+    "The group operates bottling plants across several regions and sells through distributors",
+    "Management reviewed the energy strategy and renewed supply contracts with regional utilities",
+    "Water stewardship programmes continued in every watershed where the company sources water",
+    "Packaging collection schemes were expanded together with local partners and municipalities",
+    "The board oversees climate risks through its audit committee and a dedicated working group",
+    "Employees took part in safety training and the number of reported incidents went down again",
+    "Fleet vehicles are being replaced with electric trucks at the largest distribution centres",
+    "Suppliers of sugar and juice concentrate were assessed against the responsible sourcing code",
+    "Refrigeration equipment placed in retail outlets now uses natural refrigerants where possible",
+    "Community investment focused on youth employment and access to clean water in rural areas",
+    "Internal carbon pricing is applied when evaluating new production lines and warehouse sites",
+    "Progress against these commitments is published each year together with independent assurance",
+])
+
+
+class PageNormaliserTests(SimpleTestCase):
+    def normalise(self, pages, **options):
+        normaliser = PageNormaliser(min_pages=3, **options)
+        return list(normaliser.iter_pages(pages)), normaliser.stats()
+
+    def test_strips_headers_page_numbers_and_margin(self):
+        pages = [page(n, f"   Revenue {n * 100} million\n     indented note {n}") for n in range(1, 6)]
+        out, stats = self.normalise(pages)
+        self.assertEqual(out[0], "Revenue 100 million\n  indented note 1")
+        self.assertEqual(len(out), 5)
+        self.assertEqual(stats['lines_dropped'], 5)
+
+    def test_near_duplicate_pages_are_dropped(self):
+        # One reworded phrase still leaves over 90% of the word shingles in common
+        reworded = BODY.replace("renewed supply contracts", "extended supply contracts")
+        self.assertNotEqual(reworded, BODY)
+        pages = [page(1, BODY + "\n   Revenue 100"), page(2, reworded + "\n   Revenue 100")]
+        out, stats = self.normalise(pages)
+        self.assertEqual(len(out), 1)
+        self.assertEqual(stats['pages_dropped'], 1)
+
+    def test_pages_below_the_threshold_or_with_other_numbers_are_kept(self):
+        rewritten = (
+            BODY.replace("renewed", "extended").replace("bottling", "canning").replace("electric", "hydrogen")
+        )
+        pages = [
+            page(1, BODY + "\n   Revenue 100"),
+            page(2, rewritten + "\n   Revenue 100"),
+            page(3, BODY + "\n   Revenue 101"),
+            page(4, "   Something else entirely, 7 items"),
+        ]
+        out, stats = self.normalise(pages)
+        self.assertEqual(len(out), 4)
+        self.assertIn("canning plants", out[1])
+        self.assertTrue(out[2].endswith("Revenue 101"))
+        self.assertEqual(stats['pages_dropped'], 0)
+
+    def test_removed_counts_are_never_negative(self):
+        # Double line separators make the output longer than the input
+        pages = ["a\nb\nc\nd"] * 1 + ["e\nf\ng 2"]
+        out, stats = self.normalise(pages, line_sep='\n\n')
+        self.assertGreater(sum(map(len, out)), sum(map(len, pages)))
+        self.assertEqual(stats['chars_removed'], 0)
+        self.assertEqual(stats['tokens_removed'], 0)
+
+        out, stats = self.normalise([page(n, BODY) for n in range(1, 4)], line_sep='\n\n')
+        self.assertEqual(len(out), 1)
+        self.assertGreater(stats['chars_removed'], len(BODY))
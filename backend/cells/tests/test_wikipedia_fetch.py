@@ -0,0 +1,106 @@
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+import requests
+from django.test import SimpleTestCase
+
+from cells.base.disk_cache import DiskCache
+from cells.wikipedia import fetch
+
+PAGE = b"""<html><head><script>RLCONF={"wgRevisionId":4242};</script></head><body>
+<table class="wikitable"><tr><th>Country</th><th>Population</th></tr>
+<tr><td rowspan="2">Atlantis</td><td>1,000</td></tr><tr><td>2,000</td></tr></table>
+<table class="wikitable sortable"><tr><th>Year</th></tr><tr><td>2020</td></tr></table>
+</body></html>"""
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    requests_seen = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.requests_seen.append((self.path, self.headers.get('If-None-Match')))
+        if self.path == '/broken':
+            self.respond(500, b'error')
+        elif self.headers.get('If-None-Match') == '"v1"':
+            self.respond(304, b'')
+        else:
+            self.respond(200, PAGE)
+
+    def respond(self, status, body):
+        self.send_response(status)
+        self.send_header('ETag', '"v1"')
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FetchPageTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), PageHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f'http://127.0.0.1:{cls.server.server_address[1]}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        PageHandler.requests_seen = []
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        patcher = mock.patch.object(fetch, 'page_cache', DiskCache(directory.name, 1024 * 1024))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_miss_then_fresh(self):
+        url = self.base_url + '/wiki/Atlantis'
+        page, served = fetch.fetch_page(url)
+        self.assertEqual(served, 'miss')
+        self.assertEqual(page['content'], PAGE)
+        self.assertEqual(page['version'], 'rev:4242')
+        self.assertEqual(fetch.fetch_page(url)[1], 'fresh')
+        self.assertEqual(len(PageHandler.requests_seen), 1)
+
+    def test_revalidated_when_stale(self):
+        url = self.base_url + '/wiki/Atlantis'
+        fetch.fetch_page(url)
+        with mock.patch.object(fetch, 'WIKIPEDIA_STALE_SECONDS', -1):
+            page, served = fetch.fetch_page(url)
+        self.assertEqual(served, 'revalidated')
+        self.assertEqual(page['content'], PAGE)
+        self.assertEqual(PageHandler.requests_seen[-1], ('/wiki/Atlantis', '"v1"'))
+
+    def test_error_page_is_not_cached(self):
+        url = self.base_url + '/broken'
+        self.assertEqual(fetch.fetch_page(url)[1], 'uncached')
+        self.assertEqual(fetch.fetch_page(url)[1], 'uncached')
+        self.assertEqual(len(PageHandler.requests_seen), 2)
+
+    def test_stale_copy_when_unreachable(self):
+        url = self.base_url + '/wiki/Atlantis'
+        fetch.fetch_page(url)
+        with mock.patch.object(fetch, 'WIKIPEDIA_STALE_SECONDS', -1), \
+                mock.patch.object(fetch.get_session(), 'get', side_effect=requests.ConnectionError('down')):
+            page, served = fetch.fetch_page(url)
+        self.assertEqual(served, 'stale')
+        self.assertEqual(page['content'], PAGE)
+
+    def test_extract_tables(self):
+        page, _ = fetch.fetch_page(self.base_url + '/wiki/Atlantis')
+        result = fetch.extract_tables(page)
+        self.assertEqual(result['table_count'], 2)
+        self.assertEqual(result['tables'][0]['headers'], ['Country', 'Population'])
+        self.assertEqual(result['tables'][0]['data'], [['Atlantis', '1,000'], ['Atlantis', '2,000']])
+        only = fetch.extract_tables(page, table_index=1)
+        self.assertEqual([t['index'] for t in only['tables']], [1])
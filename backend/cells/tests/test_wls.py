@@ -0,0 +1,59 @@
+import numpy as np
+from django.test import SimpleTestCase
+from sklearn.linear_model import LinearRegression
+from sklearn.metrics import r2_score
+
+from cells.sustainability.wls import best_predictions
+
+
+def sklearn_predictions(x, y, w, candidates):
+    """The per-pair LinearRegression loop get_ongil_ccf_estimates ran before the closed-form fit"""
+    pred = np.full(y.shape, np.nan)
+    model = LinearRegression(fit_intercept=False)
+    for i, rows in enumerate(candidates):
+        max_score = -np.inf
+        for r in rows:
+            train = ~np.isnan(x[r]) & ~np.isnan(y[i])
+            if train.sum() < 3:
+                continue
+            model.fit(x[r, train, None], y[i, train], sample_weight=w[train])
+            present = ~np.isnan(x[r])
+            y_pred = model.predict(x[r, present, None])
+            score = r2_score(y[i, train], model.predict(x[r, train, None]))
+            if score >= max_score:
+                max_score = score
+                pred[i, present] = y_pred
+    return pred
+
+
+class ClosedFormWLSTests(SimpleTestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        years = 10
+        self.w = 1.2 ** np.arange(years)
+        x = rng.uniform(100, 1000, (6, years))
+        x[1] = x[0] * 3
+        x[2] = 0.0
+        x[3, :2] = np.nan
+        x[4, [1, 5, 8]] = np.nan
+        self.x = x
+        y = rng.uniform(1000, 50000, (6, years))
+        y[1] = 5000.0
+        y[2, rng.random(years) < 0.3] = 0
+        y[3] = x[0] * 7
+        y[4, 2:] = np.nan
+        y[5, ::2] = np.nan
+        # Reported zeros are treated as missing, as get_ongil_ccf_estimates does
+        self.y = np.where(y == 0, np.nan, y)
+        self.candidates = [[0, 1, 2], [2, 0, 3], [2, 4], [0, 1], [0, 3, 4], [5, 4, 3, 2, 1, 0]]
+
+    def test_matches_sklearn(self):
+        pred, slopes, scores = best_predictions(self.x, self.y, self.w, self.candidates)
+        expected = sklearn_predictions(self.x, self.y, self.w, self.candidates)
+        np.testing.assert_allclose(pred, expected, rtol=1e-9)
+        self.assertTrue(np.isnan(pred[4]).all())
+
+    def test_no_candidates(self):
+        pred, slopes, scores = best_predictions(self.x, self.y[:2], self.w, [[], []])
+        self.assertTrue(np.isnan(pred).all())
+        self.assertEqual(slopes.shape, (2, 0))
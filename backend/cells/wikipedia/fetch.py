@@ -0,0 +1,164 @@
+import hashlib
+import logging
+import multiprocessing
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config.settings import WIKIPEDIA_CACHE_DIR, WIKIPEDIA_CACHE_MAX_BYTES, WIKIPEDIA_STALE_SECONDS
+from config.settings import WIKIPEDIA_CONNECT_TIMEOUT, WIKIPEDIA_READ_TIMEOUT, WIKIPEDIA_POOL_SIZE
+from config.settings import WIKIPEDIA_HOST_CONCURRENCY, WIKIPEDIA_PARSE_PROCESSES
+from ..base.disk_cache import DiskCache, make_key
+from .tables import parse_tables
+
+logger = logging.getLogger(__name__)
+
+# MediaWiki embeds the revision shown in every article page
+REVISION_RE = re.compile(rb'"wgRevisionId"\s*:\s*(\d+)')
+
+page_cache = DiskCache(WIKIPEDIA_CACHE_DIR, WIKIPEDIA_CACHE_MAX_BYTES)
+
+_session = None
+_session_lock = threading.Lock()
+_parse_executor = None
+_parse_executor_lock = threading.Lock()
+_host_semaphores = {}
+_host_lock = threading.Lock()
+
+
+def get_session():
+    """Keep-alive session shared by every Wikipedia fetch"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=WIKIPEDIA_POOL_SIZE, pool_maxsize=WIKIPEDIA_POOL_SIZE)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _session = session
+    return _session
+
+
+def page_version(content, etag=None):
+    """Revision id when the page carries one, otherwise the ETag or a hash of the body"""
+    match = REVISION_RE.search(content)
+    if match is not None:
+        return 'rev:' + match.group(1).decode()
+    if etag:
+        return 'etag:' + etag
+    return 'sha256:' + hashlib.sha256(content).hexdigest()
+
+
+def fetch_page(url):
+    """Page body for url, revalidated with ETag/If-Modified-Since once older than the stale window.
+
+    Returns the cached page entry and how it was served: fresh, revalidated, miss, stale or uncached.
+    """
+    key = make_key('page', url)
+    entry = page_cache.get(key)
+    if entry is not None and time.time() - entry['fetched_at'] <= WIKIPEDIA_STALE_SECONDS:
+        return entry, 'fresh'
+
+    headers = {}
+    if entry is not None:
+        if entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+    try:
+        response = get_session().get(
+            url, headers=headers, timeout=(WIKIPEDIA_CONNECT_TIMEOUT, WIKIPEDIA_READ_TIMEOUT)
+        )
+    except requests.RequestException as e:
+        if entry is None:
+            raise
+        logger.warning(f"Serving stale copy of {url}: {str(e)}")
+        return entry, 'stale'
+
+    if response.status_code == 304 and entry is not None:
+        entry['fetched_at'] = time.time()
+        page_cache.set(key, entry)
+        return entry, 'revalidated'
+
+    entry = {
+        'url': url,
+        'content': response.content,
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+        'version': page_version(response.content, response.headers.get('ETag')),
+        'fetched_at': time.time(),
+    }
+    # Error pages are parsed like before but never cached
+    if response.status_code != 200:
+        return entry, 'uncached'
+    page_cache.set(key, entry)
+    return entry, 'miss'
+
+
+def extract_tables(page, table_index=None, executor=None):
+    """Table dicts for the requested table_index (or all tables), cached per page version.
+
+    With an executor the parse runs there, keeping lxml work off the calling thread.
+    """
+    key = make_key('tables', page['url'], page['version'], table_index)
+    cached = page_cache.get(key)
+    if cached is not None:
+        return cached
+
+    result = None
+    if executor is not None:
+        try:
+            result = executor.submit(parse_tables, page['content'], table_index).result()
+        except BrokenProcessPool as e:
+            logger.error(f"Table parse pool failed, parsing {page['url']} inline: {str(e)}")
+            reset_parse_executor(executor)
+    if result is None:
+        result = parse_tables(page['content'], table_index)
+    logger.info(f"Found {result['table_count']} wikitable tables in {page['url']}")
+    page_cache.set(key, result)
+    return result
+
+
+@contextmanager
+def host_slot(url):
+    """Hold one of the host's connection slots, so a batch does not flood a single site"""
+    host = urlsplit(url).netloc
+    with _host_lock:
+        semaphore = _host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = threading.BoundedSemaphore(WIKIPEDIA_HOST_CONCURRENCY)
+            _host_semaphores[host] = semaphore
+    with semaphore:
+        yield
+
+
+def get_parse_executor():
+    """Process pool for batch table parsing, or None when parsing should stay in the fetch threads"""
+    global _parse_executor
+    if WIKIPEDIA_PARSE_PROCESSES <= 1:
+        return None
+    if _parse_executor is None:
+        with _parse_executor_lock:
+            if _parse_executor is None:
+                # spawn avoids forking the multi-threaded web worker
+                _parse_executor = ProcessPoolExecutor(
+                    max_workers=WIKIPEDIA_PARSE_PROCESSES,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+    return _parse_executor
+
+
+def reset_parse_executor(executor):
+    global _parse_executor
+    with _parse_executor_lock:
+        if _parse_executor is executor:
+            _parse_executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
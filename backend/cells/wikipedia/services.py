@@ -1,146 +1,128 @@
-import pandas as pd
-import requests
-from bs4 import BeautifulSoup
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+
+from config.settings import WIKIPEDIA_BATCH_MAX_ITEMS, WIKIPEDIA_BATCH_CONCURRENCY
 from ..base.cell import BaseCell
+from ..base.metrics import span, propagate
+from ..base.results import table_payload
+from ..base.serializers import TableFormatSerializer
+from .fetch import fetch_page, extract_tables, host_slot, get_parse_executor
+from .tables import table_frame
 
+logger = logging.getLogger(__name__)
+
+
+def columnar_table(table, limit=None):
+    return {
+        'index': table['index'],
+        'title': table['title'],
+        'headers': table['headers'],
+        **table_payload(table_frame(table), table['headers'], limit)
+    }
+
+
+def extract_page(url, table_index=None, parse_executor=None, table_format='rows', limit=None):
+    """Response data for one article: its tables, metadata and error"""
+    try:
+        logger.info(f"Attempting to extract tables from: {url}")
 
-class WikipediaExtractorCell(BaseCell):
-    def validate_input(self, data):
-        return 'source' in data and isinstance(data['source'], str)
-
-    def process(self, data):
-        import logging
-        logger = logging.getLogger(__name__)
-        
-        url = data['source']
-        table_index = data.get('table_index')
-        
         try:
-            logger.info(f"Attempting to extract tables from: {url}")
-            
-            try:
-                # Fetch the page content
-                response = requests.get(url)
-                soup = BeautifulSoup(response.content, 'html5lib')
-                
-                # Find all table elements
-                all_tables = soup.find_all('table', class_='wikitable')
-                logger.info(f"Found {len(all_tables)} wikitable tables")
-                
-                # Convert valid tables using pandas
-                tables = []
-                for table in all_tables:
-                    try:
-                        # Convert the table HTML to string and parse with pandas
-                        df = pd.read_html(str(table), flavor='html5lib')[0]
-                        tables.append(df)
-                        logger.info("Successfully parsed table")
-                    except Exception as e:
-                        logger.warning(f"Failed to parse table: {str(e)}")
-                        continue
-                        
-                logger.info(f"Successfully processed {len(tables)} tables")
-            except ValueError as e:
-                logger.error(f"Failed to extract tables: {str(e)}")
-                return {
-                    'data': {
-                        'tables': [],
-                        'error': "No tables found on this Wikipedia page"
-                    }
-                }
-            except Exception as e:
-                logger.error(f"Error reading HTML: {str(e)}")
-                return {
-                    'data': {
-                        'tables': [],
-                        'error': f"Failed to read tables: {str(e)}"
-                    }
-                }
-            
-            if not tables:
-                logger.warning("No tables found")
-                return {
-                    'data': {
-                        'tables': [],
-                        'error': "No tables found on this Wikipedia page"
-                    }
-                }
-                
-            logger.info("Processing tables...")
-            processed_tables = []
-            
-            for idx, table in enumerate(tables):
-                if table_index is not None and idx != table_index:
-                    continue
-                
-                try:
-                    # Convert any non-string values to strings
-                    table = table.astype(str)
-                    
-                    # Handle potential NaN values
-                    table = table.fillna('')
-                    
-                    # Convert DataFrame to dict
-                    table_dict = {
-                        'index': idx,
-                        'title': f'Table {idx + 1}',
-                        'headers': table.columns.tolist(),
-                        'data': table.values.tolist()
-                    }
-                    
-                    processed_tables.append(table_dict)
-                    logger.info(f"Processed table {idx + 1}")
-                except Exception as e:
-                    logger.error(f"Error processing table {idx}: {str(e)}")
-                    continue
-            
-            if not processed_tables:
-                return {
-                    'data': {
-                        'tables': [],
-                        'error': "Failed to process any tables from the page"
-                    }
-                }
-            
-            logger.info("Preparing response...")
-            response = {
-                'data': {
-                    'tables': processed_tables,
-                    'metadata': {
-                        'article_title': url.split('/')[-1],
-                        'table_count': len(processed_tables),
-                        'extraction_timestamp': datetime.now().isoformat()
-                    },
-                    'error': None
-                }
+            # Fetch through the shared session and page cache; parsed tables are cached per page revision
+            with host_slot(url), span('fetch'):
+                page, cache_status = fetch_page(url)
+            with span('parse'):
+                result = extract_tables(page, table_index, parse_executor)
+        except Exception as e:
+            logger.error(f"Error reading HTML: {str(e)}")
+            return {
+                'tables': [],
+                'error': f"Failed to read tables: {str(e)}"
             }
-            
-            # Verify response is JSON serializable
-            try:
-                import json
-                json.dumps(response)
-                logger.info("Response prepared successfully")
-                return response
-            except Exception as e:
-                logger.error(f"Response serialization error: {str(e)}")
-                return {
-                    'data': {
-                        'tables': [],
-                        'error': "Failed to serialize response data"
-                    }
-                }
-        except ValueError as e:
+
+        if result['table_count'] == 0:
+            logger.warning("No tables found")
             return {
-                'data': {
-                    'tables': [],
-                    'error': str(e)
-                }
+                'tables': [],
+                'error': "No tables found on this Wikipedia page"
             }
-        except Exception as e:
+
+        processed_tables = result['tables']
+        if not processed_tables:
             return {
-                'data': {
-                    'tables': [],
-                    'error': f"Failed to extract tables: {str(e)}"
-                }
+                'tables': [],
+                'error': "Failed to process any tables from the page"
+            }
+        if table_format == 'columnar':
+            processed_tables = [columnar_table(table, limit) for table in processed_tables]
+
+        logger.info("Response prepared successfully")
+        return {
+            'tables': processed_tables,
+            'metadata': {
+                'article_title': url.split('/')[-1],
+                'table_count': len(processed_tables),
+                'cache': cache_status,
+                'extraction_timestamp': datetime.now().isoformat()
+            },
+            'error': None
+        }
+    except Exception as e:
+        return {
+            'tables': [],
+            'error': f"Failed to extract tables: {str(e)}"
+        }
+
+
+class WikipediaExtractorCell(BaseCell):
+    def validate_input(self, data):
+        return 'source' in data and isinstance(data['source'], str) and TableFormatSerializer(data=data).is_valid()
+
+    def process(self, data, *args, **kwargs):
+        serializer = TableFormatSerializer(data=data)
+        serializer.is_valid()
+        return {'data': extract_page(
+            data['source'], data.get('table_index'),
+            table_format=serializer.validated_data.get('format'), limit=serializer.validated_data.get('limit')
+        )}
+
+
+class WikipediaBatchExtractorCell(BaseCell):
+    def validate_input(self, data):
+        items = data.get('items')
+        if not isinstance(items, list) or not 0 < len(items) <= WIKIPEDIA_BATCH_MAX_ITEMS:
+            return False
+        if not TableFormatSerializer(data=data).is_valid():
+            return False
+        return all(isinstance(item, dict) and isinstance(item.get('source'), str) for item in items)
+
+    def process(self, data, *args, **kwargs):
+        items = data['items']
+        serializer = TableFormatSerializer(data=data)
+        serializer.is_valid()
+        table_format = serializer.validated_data.get('format')
+        limit = serializer.validated_data.get('limit')
+        parse_executor = get_parse_executor()
+
+        def run(item):
+            result = extract_page(item['source'], item.get('table_index'), parse_executor, table_format, limit)
+            return {'source': item['source'], 'table_index': item.get('table_index'), **result}
+
+        # Fetches overlap across articles (host_slot caps each site); results keep the request order
+        with ThreadPoolExecutor(max_workers=min(WIKIPEDIA_BATCH_CONCURRENCY, len(items))) as executor:
+            results = list(executor.map(propagate(run), items))
+
+        failed = sum(1 for result in results if result['error'] is not None)
+        logger.info(f"Batch extracted {len(results) - failed} of {len(results)} articles")
+        return {
+            'data': {
+                'results': results,
+                'metadata': {
+                    'item_count': len(results),
+                    'succeeded': len(results) - failed,
+                    'failed': failed,
+                    'extraction_timestamp': datetime.now().isoformat()
+                },
+                'error': None
             }
+        }
@@ -0,0 +1,71 @@
+import logging
+
+import pandas as pd
+
+from ..base.html_tables import parse_html, has_text, is_hidden, strip_hidden, table_rows
+
+logger = logging.getLogger(__name__)
+
+WIKITABLE_XPATH = "//table[contains(concat(' ', normalize-space(@class), ' '), ' wikitable ')]"
+
+
+def find_wikitables(content):
+    """Every displayed wikitable with any text, in page order, from a single parse of the page"""
+    doc = parse_html(content)
+    return [t for t in doc.xpath(WIKITABLE_XPATH) if has_text(t) and not is_hidden(t)]
+
+
+def table_headers(head, width):
+    """Column names from the header rows; stacked header rows give one list per column"""
+    if not head:
+        return list(range(width))
+    head = [row + [''] * (width - len(row)) for row in head]
+    if len(head) > 1:
+        # Rows with no text in any cell do not name columns
+        head = [row for row in head if any(row)] or head[:1]
+    if len(head) == 1:
+        return head[0]
+    return [list(levels) for levels in zip(*head)]
+
+
+def table_to_dict(table, idx):
+    """Build the response rows for one wikitable, copying rowspan/colspan cells into every position they cover"""
+    strip_hidden(table)
+    head, body, foot = table_rows(table)
+    rows = body + foot
+    width = max((len(row) for row in head + rows), default=0)
+    return {
+        'index': idx,
+        'title': f'Table {idx + 1}',
+        'headers': table_headers(head, width),
+        'data': [row + [''] * (width - len(row)) for row in rows],
+    }
+
+
+def parse_tables(content, table_index=None):
+    """Table dicts for the requested table_index, or every table, along with the page's table count"""
+    tables = find_wikitables(content)
+    processed_tables = []
+    for idx, table in enumerate(tables):
+        if table_index is not None and idx != table_index:
+            continue
+        try:
+            processed_tables.append(table_to_dict(table, idx))
+        except Exception as e:
+            logger.error(f"Error processing table {idx}: {str(e)}")
+            continue
+    return {'table_count': len(tables), 'tables': processed_tables}
+
+
+def table_frame(table):
+    """DataFrame of a table dict's rows, with columns whose every non-empty cell is a number typed as numbers"""
+    frame = pd.DataFrame(table['data'], columns=range(len(table['headers'])))
+    for column in frame.columns:
+        cells = frame[column].str.strip()
+        filled = cells != ''
+        if not filled.any():
+            continue
+        numbers = pd.to_numeric(cells[filled].str.replace(',', '', regex=False), errors='coerce')
+        if numbers.notna().all():
+            frame[column] = numbers.reindex(frame.index)
+    return frame
@@ -1,6 +1,7 @@
 from django.urls import path
-from .views import WikipediaExtractorView
+from .views import WikipediaExtractorView, WikipediaBatchExtractorView
 
 urlpatterns = [
     path('extract/', WikipediaExtractorView.as_view(), name='wikipedia-extract'),
+    path('batch/', WikipediaBatchExtractorView.as_view(), name='wikipedia-batch'),
 ]
@@ -1,6 +1,10 @@
 from ..base.cell import BaseCellView
-from .services import WikipediaExtractorCell
+from .services import WikipediaExtractorCell, WikipediaBatchExtractorCell
 
 
 class WikipediaExtractorView(BaseCellView):
     cell_class = WikipediaExtractorCell
+
+
+class WikipediaBatchExtractorView(BaseCellView):
+    cell_class = WikipediaBatchExtractorCell
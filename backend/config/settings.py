@@ -155,6 +155,87 @@ LOGGING = {
     },
 }
 
+# Request logging: "access" logs one line of method, path, status, sizes and timing per request,
+# "full" also logs every body, "off" disables it. Bodies over the cap are truncated and hashed.
+REQUEST_LOG_MODE = config("REQUEST_LOG_MODE", default="access")
+REQUEST_LOG_BODY_CAP = config("REQUEST_LOG_BODY_CAP", default=2048, cast=int)
+# Fraction of requests in access mode that also log their (capped) bodies
+REQUEST_LOG_SAMPLE_RATE = config("REQUEST_LOG_SAMPLE_RATE", default=0.0, cast=float)
+
+# Background cell jobs (requested with ?async=true on any cell endpoint)
+CELL_JOB_WORKERS = config("CELL_JOB_WORKERS", default=4, cast=int)
+CELL_JOB_QUEUE_SIZE = config("CELL_JOB_QUEUE_SIZE", default=32, cast=int)
+CELL_JOB_RETENTION = config("CELL_JOB_RETENTION", default=200, cast=int)
+
+# Report extraction: files processed at once and how batches of pages are sent to the LLM
+EXTRACTION_CONCURRENCY = config("EXTRACTION_CONCURRENCY", default=4, cast=int)
+# "chain" passes each batch the JSON extracted so far; "map_reduce" extracts batches independently and merges
+EXTRACTION_MODE = config("EXTRACTION_MODE", default="chain")
+MAP_REDUCE_CONCURRENCY = config("MAP_REDUCE_CONCURRENCY", default=4, cast=int)
+# PDF text extraction processes and pages handed to each at a time
+PDF_TEXT_PROCESSES = config("PDF_TEXT_PROCESSES", default=os.cpu_count() or 1, cast=int)
+PDF_PAGES_PER_SHARD = config("PDF_PAGES_PER_SHARD", default=20, cast=int)
+# Annual report pages kept per parameter before adding neighbours; 0 sends the whole document
+RELEVANCE_PAGES_PER_PARAMETER = config("RELEVANCE_PAGES_PER_PARAMETER", default=3, cast=int)
+RELEVANCE_NEIGHBOURS = config("RELEVANCE_NEIGHBOURS", default=1, cast=int)
+# Lines repeated at the top or bottom of this many pages are treated as running headers/footers
+BOILERPLATE_MIN_PAGES = config("BOILERPLATE_MIN_PAGES", default=3, cast=int)
+
+# LLM gateway: requests in flight, pooled connections and request timeout
+LLM_MAX_IN_FLIGHT = config("LLM_MAX_IN_FLIGHT", default=8, cast=int)
+LLM_MAX_CONNECTIONS = config("LLM_MAX_CONNECTIONS", default=16, cast=int)
+LLM_TIMEOUT = config("LLM_TIMEOUT", default=600, cast=float)
+# "live" calls Azure OpenAI, "record" also stores every response under LLM_FIXTURE_DIR, "replay" answers
+# only from those fixtures and "local" calls the stand-in server (python -m cells.sustainability.llm_standin)
+LLM_TRANSPORT = config("LLM_TRANSPORT", default="live")
+LLM_LOCAL_URL = config("LLM_LOCAL_URL", default="http://127.0.0.1:8765")
+# Replay sleeps for each fixture's recorded latency, for concurrency experiments
+LLM_REPLAY_LATENCY = config("LLM_REPLAY_LATENCY", default=False, cast=bool)
+
+# On-disk caches hold pickled LLM responses and extraction results, so they live outside MEDIA_ROOT,
+# which is served over HTTP when DEBUG is on
+CACHE_ROOT = config("CACHE_ROOT", default=os.path.join(BASE_DIR, 'var', 'cache'))
+
+# On-disk cache of LLM extraction responses
+LLM_CACHE_DIR = config("LLM_CACHE_DIR", default=os.path.join(CACHE_ROOT, 'llm'))
+LLM_CACHE_MAX_BYTES = config("LLM_CACHE_MAX_BYTES", default=512 * 1024 * 1024, cast=int)
+LLM_CACHE_TTL = config("LLM_CACHE_TTL", default=30 * 24 * 3600, cast=int)
+# Recorded chat completions written with LLM_TRANSPORT=record and served with LLM_TRANSPORT=replay
+LLM_FIXTURE_DIR = config("LLM_FIXTURE_DIR", default=os.path.join(BASE_DIR, 'var', 'fixtures', 'llm'))
+
+# On-disk cache of per-document extraction results
+DOCUMENT_CACHE_DIR = config("DOCUMENT_CACHE_DIR", default=os.path.join(CACHE_ROOT, 'documents'))
+DOCUMENT_CACHE_MAX_BYTES = config("DOCUMENT_CACHE_MAX_BYTES", default=256 * 1024 * 1024, cast=int)
+DOCUMENT_CACHE_TTL = config("DOCUMENT_CACHE_TTL", default=30 * 24 * 3600, cast=int)
+
+# Cached table results served page by page to columnar-format requests
+RESULT_CACHE_DIR = config("RESULT_CACHE_DIR", default=os.path.join(CACHE_ROOT, 'results'))
+RESULT_CACHE_MAX_BYTES = config("RESULT_CACHE_MAX_BYTES", default=256 * 1024 * 1024, cast=int)
+RESULT_CACHE_TTL = config("RESULT_CACHE_TTL", default=3600, cast=int)
+RESULT_PAGE_SIZE = config("RESULT_PAGE_SIZE", default=500, cast=int)
+
+# Fitted CCF regression models per session, reused by later estimates and what-if queries
+CCF_MODEL_CACHE_DIR = config("CCF_MODEL_CACHE_DIR", default=os.path.join(CACHE_ROOT, 'ccf_models'))
+CCF_MODEL_CACHE_MAX_BYTES = config("CCF_MODEL_CACHE_MAX_BYTES", default=64 * 1024 * 1024, cast=int)
+CCF_MODEL_CACHE_TTL = config("CCF_MODEL_CACHE_TTL", default=30 * 24 * 3600, cast=int)
+# Batch CCF estimation: company estimation processes and companies accepted per request
+CCF_ESTIMATE_PROCESSES = config("CCF_ESTIMATE_PROCESSES", default=os.cpu_count() or 1, cast=int)
+CCF_BATCH_MAX_COMPANIES = config("CCF_BATCH_MAX_COMPANIES", default=50, cast=int)
+
+# Wikipedia fetches: pooled session and conditional-request cache of pages and parsed tables
+WIKIPEDIA_CACHE_DIR = config("WIKIPEDIA_CACHE_DIR", default=os.path.join(CACHE_ROOT, 'wikipedia'))
+WIKIPEDIA_CACHE_MAX_BYTES = config("WIKIPEDIA_CACHE_MAX_BYTES", default=128 * 1024 * 1024, cast=int)
+# Cached pages younger than this are served without revalidating
+WIKIPEDIA_STALE_SECONDS = config("WIKIPEDIA_STALE_SECONDS", default=300, cast=int)
+WIKIPEDIA_CONNECT_TIMEOUT = config("WIKIPEDIA_CONNECT_TIMEOUT", default=5, cast=float)
+WIKIPEDIA_READ_TIMEOUT = config("WIKIPEDIA_READ_TIMEOUT", default=30, cast=float)
+WIKIPEDIA_POOL_SIZE = config("WIKIPEDIA_POOL_SIZE", default=10, cast=int)
+# Batch extraction: items fetched at once, connections per host, parse processes (1 parses in the fetch threads)
+WIKIPEDIA_BATCH_MAX_ITEMS = config("WIKIPEDIA_BATCH_MAX_ITEMS", default=100, cast=int)
+WIKIPEDIA_BATCH_CONCURRENCY = config("WIKIPEDIA_BATCH_CONCURRENCY", default=16, cast=int)
+WIKIPEDIA_HOST_CONCURRENCY = config("WIKIPEDIA_HOST_CONCURRENCY", default=4, cast=int)
+WIKIPEDIA_PARSE_PROCESSES = config("WIKIPEDIA_PARSE_PROCESSES", default=os.cpu_count() or 1, cast=int)
+
 # Internationalization
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'UTC'